@@ -1,10 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
+from functools import partial
 import uvicorn
+import json
 import os
 from app.models.predictor import PregnancyRiskPredictor
+from app.utils.jobs import JobError, JobRunner, describe_job
+from app.utils.scheduler import BULK, INTERACTIVE, PriorityScheduler
+from app.utils.warmup import ReadinessState, WarmupConfig
 
 app = FastAPI(
     title="NeoCareSync ML Service",
@@ -24,6 +30,25 @@ app.add_middleware(
 # Initialize predictor (set debug=True for detailed logging)
 predictor = PregnancyRiskPredictor(debug=True)  # Set to True for debugging
 
+# Largest batch accepted by /predict/batch (warm-up runs this size, not every size below it)
+MAX_BATCH_SIZE = int(os.getenv("ML_MAX_BATCH_SIZE", 256))
+
+# Warm-up + self-check state for /ready
+readiness = ReadinessState()
+
+# Priority lanes: interactive single predictions go first, bulk/batch work is chunked.
+# Clients pick a lane with the X-Priority header ("interactive" or "bulk").
+scheduler = PriorityScheduler.from_env()
+
+# Background scoring jobs (local SQLite job store, resumes after restarts)
+jobs = JobRunner.from_env(predictor, before_chunk=scheduler.wait_for_interactive)
+
+def resolve_lane(x_priority: Optional[str], default: str) -> str:
+    try:
+        return scheduler.resolve_lane(x_priority, default)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 class PredictionRequest(BaseModel):
     age: float = Field(..., ge=15, le=50, description="Patient age in years")
     systolic_bp: float = Field(..., ge=80, le=180, description="Systolic blood pressure (mmHg)")
@@ -43,23 +68,69 @@ class PredictionResponse(BaseModel):
     probabilities: dict = Field(..., description="Probability for each risk level")
     explanation: Optional[str] = Field(None, description="Explanation of the prediction")
 
+class BatchPredictionRequest(BaseModel):
+    patients: List[PredictionRequest] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE, description="Patients to score"
+    )
+
+class BatchPredictionResponse(BaseModel):
+    predictions: List[PredictionResponse] = Field(..., description="Predictions in request order")
+
+class JobRequest(BaseModel):
+    patients: Optional[List[PredictionRequest]] = Field(None, min_length=1, description="Inline dataset to score")
+    file: Optional[str] = Field(None, description="CSV/JSONL file inside ML_JOB_INPUT_DIR to score")
+    chunk_size: Optional[int] = Field(None, ge=1, le=100000, description="Rows per chunk (default: ML_JOB_CHUNK_SIZE)")
+
+@app.on_event("startup")
+async def start_warmup():
+    """Warm up the prediction pipeline in the background; /ready turns true when done"""
+    config = WarmupConfig.from_env(
+        MAX_BATCH_SIZE, extra_sizes=[scheduler.bulk_chunk_size, jobs.chunk_size]
+    )
+    readiness.start(predictor, config, scheduler)
+    jobs.start()
+
+@app.on_event("shutdown")
+async def stop_jobs():
+    """Stop job workers; unfinished jobs are resumed on the next start"""
+    jobs.stop()
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness - cheap, does not wait for warm-up)"""
     return {
         "status": "ok",
         "service": "ml-service",
         "model_loaded": predictor.is_loaded(),
-        "model_type": str(type(predictor.model).__name__) if predictor.model else None
+        "model_type": str(type(predictor.model).__name__) if predictor.model else None,
+        "threads": predictor.thread_info(),
+        "cascade": predictor.cascade_info(),
+        "quantized": predictor.quantized_info()
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint - 200 only after warm-up and self-check have passed"""
+    state = readiness.describe()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
+@app.get("/metrics")
+async def metrics():
+    """Scheduler metrics: per-lane queue depth, wait times and latency"""
+    return {
+        "scheduler": scheduler.metrics(),
+        "cascade": predictor.cascade_info()
     }
 
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_risk(request: PredictionRequest):
+async def predict_risk(request: PredictionRequest, x_priority: Optional[str] = Header(None)):
     """
     Predict pregnancy risk level from patient vitals
     
     Accepts 11 base features and returns risk prediction with confidence scores.
+    Runs in the interactive lane unless X-Priority: bulk is sent.
     """
+    lane = resolve_lane(x_priority, INTERACTIVE)
     try:
         # Log incoming request for debugging
         print("\n" + "=" * 70)
@@ -78,7 +149,8 @@ async def predict_risk(request: PredictionRequest):
         print(f"Heart Rate: {request.heart_rate}")
         print("=" * 70)
         
-        result = predictor.predict(
+        result = await scheduler.run_single(partial(
+            predictor.predict,
             age=float(request.age),
             systolic_bp=float(request.systolic_bp),
             diastolic_bp=float(request.diastolic_bp),
@@ -90,7 +162,7 @@ async def predict_risk(request: PredictionRequest):
             gestational_diabetes=int(request.gestational_diabetes),
             mental_health=int(request.mental_health),
             heart_rate=float(request.heart_rate)
-        )
+        ), lane=lane)
         
         print("\n" + "=" * 70)
         print("📤 PREDICTION RESULT")
@@ -107,6 +179,92 @@ async def predict_risk(request: PredictionRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_risk_batch(request: BatchPredictionRequest, x_priority: Optional[str] = Header(None)):
+    """
+    Predict pregnancy risk level for several patients in one call
+    
+    Accepts up to ML_MAX_BATCH_SIZE patients; predictions are returned in request order.
+    Runs in the bulk lane (chunked, yields to interactive work) unless X-Priority: interactive is sent.
+    """
+    lane = resolve_lane(x_priority, BULK)
+    try:
+        results = await scheduler.run_batch(
+            predictor.predict_batch,
+            [patient.model_dump() for patient in request.patients],
+            lane=lane
+        )
+        return BatchPredictionResponse(
+            predictions=[PredictionResponse(**result) for result in results]
+        )
+    except Exception as e:
+        print(f"\n❌ BATCH PREDICTION ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@app.post("/jobs", status_code=202)
+def submit_job(request: JobRequest):
+    """
+    Submit a background scoring job
+    
+    Send either `patients` (inline dataset) or `file` (server-side CSV/JSONL reference).
+    Returns a job id to poll with GET /jobs/{job_id}.
+    
+    Job endpoints are plain functions: FastAPI runs them in its threadpool, so job store
+    and file I/O never block the event loop (and the interactive lane).
+    """
+    if (request.patients is None) == (request.file is None):
+        raise HTTPException(status_code=400, detail="Send exactly one of 'patients' or 'file'")
+    try:
+        if request.patients is not None:
+            job_id = jobs.submit_rows(
+                [patient.model_dump() for patient in request.patients], chunk_size=request.chunk_size
+            )
+        else:
+            job_id = jobs.submit_file(request.file, chunk_size=request.chunk_size)
+    except JobError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return describe_job(jobs.store.get(job_id))
+
+@app.get("/jobs")
+def list_jobs(limit: int = 50):
+    """Most recent scoring jobs"""
+    return {"jobs": [describe_job(job) for job in jobs.store.list(limit)]}
+
+def get_job_or_404(job_id: str) -> dict:
+    job = jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """Job status and progress (rows done, rows/second)"""
+    return describe_job(get_job_or_404(job_id))
+
+@app.get("/jobs/{job_id}/results")
+def job_results(job_id: str):
+    """
+    Download results as JSON lines, one per input row (in input order)
+    
+    Available while the job runs (finished chunks only); X-Job-Status tells whether it is complete.
+    """
+    job = get_job_or_404(job_id)
+    lines = (json.dumps(result) + "\n" for result in jobs.store.iter_results(job_id))
+    return StreamingResponse(
+        lines,
+        media_type="application/x-ndjson",
+        headers={"X-Job-Status": job["status"]}
+    )
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a job (a running job stops after its current chunk)"""
+    get_job_or_404(job_id)
+    jobs.store.request_cancel(job_id)
+    return describe_job(jobs.store.get(job_id))
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
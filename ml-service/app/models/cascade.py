@@ -0,0 +1,170 @@
+"""
+Two-stage cascade for pregnancy risk prediction
+A tiny first-stage model (logistic regression or shallow tree) answers rows it is
+confident about; uncertain rows are escalated to the full tuned model.
+
+Encoding follows the label encoder: 0=High, 1=Low. Probability columns are in that order.
+"""
+
+import threading
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+HIGH = 0
+LOW = 1
+
+
+class CascadeModel:
+    """
+    First stage + calibrated thresholds
+
+    A row is answered by the first stage when
+        P1(Low)  >= low_threshold   -> Low
+        P1(High) >= high_threshold  -> High
+    and escalated to the full model otherwise. A threshold of inf disables
+    early answers for that class.
+    """
+
+    def __init__(self, stage1, low_threshold: float, high_threshold: float, report: dict = None):
+        self.stage1 = stage1
+        self.low_threshold = float(low_threshold)
+        self.high_threshold = float(high_threshold)
+        self.report = report or {}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.rows_total = 0
+            self.rows_escalated = 0
+
+    def stage1_proba(self, features_scaled: np.ndarray) -> np.ndarray:
+        return self.stage1.predict_proba(features_scaled)
+
+    def confident_mask(self, stage1_probabilities: np.ndarray) -> np.ndarray:
+        """True for rows the first stage may answer"""
+        return (
+            (stage1_probabilities[:, LOW] >= self.low_threshold) |
+            (stage1_probabilities[:, HIGH] >= self.high_threshold)
+        )
+
+    def predict_proba(self, features_scaled: np.ndarray, full_model) -> np.ndarray:
+        """
+        Cascade probabilities (columns: P(High), P(Low))
+
+        The full model only runs on the escalated rows.
+        """
+        probabilities = self.stage1_proba(features_scaled)
+        escalate = ~self.confident_mask(probabilities)
+        if escalate.any():
+            probabilities[escalate] = full_model.predict_proba(features_scaled[escalate])
+
+        with self._lock:
+            self.rows_total += len(features_scaled)
+            self.rows_escalated += int(escalate.sum())
+        return probabilities
+
+    def stats(self) -> dict:
+        """Runtime escalation counters plus the calibration report"""
+        with self._lock:
+            rows_total = self.rows_total
+            rows_escalated = self.rows_escalated
+        return {
+            'stage1': type(self.stage1).__name__,
+            'low_threshold': self.low_threshold,
+            'high_threshold': self.high_threshold,
+            'rows_total': rows_total,
+            'rows_escalated': rows_escalated,
+            'escalation_rate': rows_escalated / rows_total if rows_total else None,
+            'calibration': self.report,
+        }
+
+
+def _threshold_above(values: np.ndarray, min_confidence: float) -> float:
+    """Smallest threshold strictly above every value (and >= min_confidence)"""
+    if len(values) == 0:
+        return min_confidence
+    threshold = float(np.nextafter(values.max(), np.inf))
+    return max(min_confidence, threshold) if threshold <= 1.0 else float('inf')
+
+
+def fit_cascade(
+    full_model,
+    features_scaled: np.ndarray,
+    y_encoded: np.ndarray,
+    kind: str = "logistic",
+    min_confidence: float = 0.9
+) -> CascadeModel:
+    """
+    Fit the first stage on scaled features and calibrate its thresholds
+
+    Thresholds are set so that on the calibration rows:
+      - no row that is High (label or full model) is answered Low early, so
+        High-class recall can never drop below the full model's
+      - no row the full model calls Low is answered High early, so every
+        early answer agrees with the full model
+    """
+    if kind == "logistic":
+        stage1 = LogisticRegression(max_iter=1000, random_state=42)
+    elif kind == "tree":
+        stage1 = DecisionTreeClassifier(max_depth=3, random_state=42)
+    else:
+        raise ValueError(f"Unknown first-stage kind: {kind} (expected 'logistic' or 'tree')")
+    stage1.fit(features_scaled, y_encoded)
+
+    stage1_probabilities = stage1.predict_proba(features_scaled)
+    full_predictions = full_model.classes_.take(
+        np.argmax(full_model.predict_proba(features_scaled), axis=1)
+    )
+
+    must_not_be_low = (y_encoded == HIGH) | (full_predictions == HIGH)
+    must_not_be_high = full_predictions == LOW
+    cascade = CascadeModel(
+        stage1,
+        low_threshold=_threshold_above(stage1_probabilities[must_not_be_low, LOW], min_confidence),
+        high_threshold=_threshold_above(stage1_probabilities[must_not_be_high, HIGH], min_confidence),
+    )
+    cascade.report = evaluate_cascade(cascade, full_model, features_scaled, y_encoded)
+    return cascade
+
+
+def _high_recall(predictions: np.ndarray, y_encoded: np.ndarray) -> float:
+    high_rows = y_encoded == HIGH
+    if not high_rows.any():
+        return None
+    return float((predictions[high_rows] == HIGH).mean())
+
+
+def evaluate_cascade(cascade: CascadeModel, full_model, features_scaled: np.ndarray, y_encoded: np.ndarray) -> dict:
+    """
+    Compare the cascade with the full model on labelled rows
+
+    Returns escalation rate, agreement with the full model and High-class recall of both.
+    """
+    full_predictions = full_model.classes_.take(
+        np.argmax(full_model.predict_proba(features_scaled), axis=1)
+    )
+    stage1_probabilities = cascade.stage1_proba(features_scaled)
+    escalate = ~cascade.confident_mask(stage1_probabilities)
+    cascade_predictions = np.where(
+        escalate, full_predictions, np.argmax(stage1_probabilities, axis=1)
+    )
+
+    return {
+        'rows': int(len(y_encoded)),
+        'escalation_rate': float(escalate.mean()),
+        'agreement_with_full': float((cascade_predictions == full_predictions).mean()),
+        'high_recall_full': _high_recall(full_predictions, y_encoded),
+        'high_recall_cascade': _high_recall(cascade_predictions, y_encoded),
+    }
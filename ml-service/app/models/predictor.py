@@ -7,17 +7,40 @@ import os
 import joblib
 import numpy as np
 from pathlib import Path
+from typing import List, Optional
 from sklearn.preprocessing import StandardScaler, LabelEncoder
-from app.utils.feature_engineering import engineer_features
+from app.utils.feature_engineering import (
+    engineer_features,
+    engineer_features_batch,
+    BASE_FEATURE_NAMES,
+)
+from app.utils.thread_budget import ThreadBudget
+from app.models.quantized import QuantizedForest
 
 class PregnancyRiskPredictor:
-    def __init__(self, debug=False):
+    def __init__(
+        self,
+        debug=False,
+        thread_budget: Optional[ThreadBudget] = None,
+        cascade: Optional[bool] = None,
+        quantized: Optional[bool] = None
+    ):
         self.model = None
         self.scaler = None
         self.label_encoder = None
         self.feature_columns = None
+        self.cascade = None
+        self.quantized = None
         self.debug = debug
+        # Two-stage cascade is opt-in (ML_CASCADE=1) and needs cascade_model.pkl from train_cascade.py
+        self.cascade_enabled = cascade if cascade is not None else os.getenv("ML_CASCADE", "0") == "1"
+        # Calls with at most ML_QUANTIZED_MAX_ROWS rows are scored on bin indices (same results);
+        # larger calls use sklearn, whose compiled traversal is faster at that size
+        self.quantized_enabled = quantized if quantized is not None else os.getenv("ML_QUANTIZED", "1") == "1"
+        self.quantized_max_rows = int(os.getenv("ML_QUANTIZED_MAX_ROWS", 10000))
+        self.thread_budget = thread_budget if thread_budget is not None else ThreadBudget.from_env()
         self._load_model()
+        self.apply_thread_budget()
     
     def _load_model(self):
         """Load the trained model and preprocessing artifacts"""
@@ -30,12 +53,14 @@ class PregnancyRiskPredictor:
             model_path = artifacts_dir / "pregnancy_risk_model.pkl"
             scaler_path = artifacts_dir / "scaler.pkl"
             encoder_path = artifacts_dir / "label_encoder.pkl"
+            cascade_path = artifacts_dir / "cascade_model.pkl"
             
             # If artifacts don't exist, try root directory
             if not model_path.exists():
                 model_path = base_dir / "pregnancy_risk_model.pkl"
                 scaler_path = base_dir / "scaler.pkl"
                 encoder_path = base_dir / "label_encoder.pkl"
+                cascade_path = base_dir / "cascade_model.pkl"
             
             # Load model - REQUIRED
             if model_path.exists():
@@ -97,6 +122,31 @@ class PregnancyRiskPredictor:
                 if self.debug:
                     print(f"   Default encoding: High=0, Low=1")
             
+            # Load first-stage cascade model (optional)
+            if self.cascade_enabled:
+                if cascade_path.exists():
+                    print(f"Loading cascade first stage from: {cascade_path}")
+                    self.cascade = joblib.load(cascade_path)
+                    print("✅ Cascade loaded successfully")
+                    
+                    if self.debug:
+                        print(f"   First stage: {type(self.cascade.stage1).__name__}")
+                        print(f"   Thresholds: Low >= {self.cascade.low_threshold:.4f}, High >= {self.cascade.high_threshold:.4f}")
+                else:
+                    print(f"⚠️  Warning: Cascade enabled but {cascade_path} not found")
+                    print("   Run train_cascade.py to create it. Using the full model for every request.")
+            
+            # Precompute split thresholds and leaf tables for bulk scoring (optional)
+            if self.quantized_enabled:
+                try:
+                    self.quantized = QuantizedForest(self.model)
+                    
+                    if self.debug:
+                        info = self.quantized.describe()
+                        print(f"   Quantized scoring: {info['bin_dtype']} bins, {info['bytes_per_row']} bytes/row")
+                except ValueError as e:
+                    print(f"⚠️  Warning: Quantized scoring unavailable: {e}")
+            
             print(f"\n🎯 Model ready for predictions!")
             
         except Exception as e:
@@ -109,6 +159,76 @@ class PregnancyRiskPredictor:
         """Check if model is loaded"""
         return self.model is not None and self.scaler is not None
     
+    def apply_thread_budget(self, thread_budget: Optional[ThreadBudget] = None):
+        """
+        Set native thread counts (model n_jobs, OpenMP/BLAS pools) from the thread budget
+        
+        Called at startup; call again with a new budget to reconfigure (e.g. in benchmarks).
+        """
+        if thread_budget is not None:
+            self.thread_budget = thread_budget
+        self.thread_budget.apply(self.model)
+        
+        if self.debug:
+            print(f"   Thread budget: {self.thread_budget.threads_per_worker} thread(s) per worker "
+                  f"({self.thread_budget.total_threads} total / {self.thread_budget.workers} worker(s)), "
+                  f"{self.thread_budget.model_threads} per model call "
+                  f"({self.thread_budget.concurrent_calls} concurrent call(s))")
+    
+    def thread_info(self) -> dict:
+        """Current thread configuration"""
+        return self.thread_budget.describe()
+    
+    def cascade_info(self) -> Optional[dict]:
+        """Cascade escalation stats (None if the cascade is not active)"""
+        return self.cascade.stats() if self.cascade is not None else None
+    
+    def quantized_info(self) -> Optional[dict]:
+        """Quantized scoring layout (None if disabled)"""
+        if self.quantized is None:
+            return None
+        return dict(self.quantized.describe(), max_rows=self.quantized_max_rows)
+    
+    def _use_quantized(self, n_rows: int) -> bool:
+        return self.quantized is not None and n_rows <= self.quantized_max_rows
+    
+    def _predict_proba(self, features_scaled: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities for scaled features, ordered like label_encoder.classes_ (High, Low)
+        
+        With the cascade active, the first stage answers confident rows and only
+        uncertain rows go through the full model. With quantized scoring on, calls of
+        up to quantized_max_rows rows run the full model on bin indices, which gives
+        the same probabilities.
+        """
+        full_model = self.model
+        if self._use_quantized(len(features_scaled)):
+            full_model = self.quantized
+        if self.cascade is not None:
+            return self.cascade.predict_proba(features_scaled, full_model)
+        return full_model.predict_proba(features_scaled)
+    
+    def quantize_features(self, features: np.ndarray, chunk_rows: int = 65536) -> np.ndarray:
+        """
+        Scale and quantize an engineered (n_rows, 16) feature matrix for bulk scoring
+        
+        Scaling runs chunk by chunk, so only the uint8/uint16 bins (n_features, n_rows)
+        are kept for the whole matrix. Score them with predict_proba_quantized().
+        """
+        if self.quantized is None:
+            raise RuntimeError("Quantized scoring is not enabled")
+        bins = np.empty((self.quantized.n_features, len(features)), dtype=self.quantized.bin_dtype)
+        for start in range(0, len(features), chunk_rows):
+            chunk = np.asarray(features[start:start + chunk_rows], dtype=np.float64)
+            bins[:, start:start + len(chunk)] = self.quantized.quantize(self.scaler.transform(chunk))
+        return bins
+    
+    def predict_proba_quantized(self, bins: np.ndarray) -> np.ndarray:
+        """Full-model probabilities (P(High), P(Low)) for bins from quantize_features()"""
+        if self.quantized is None:
+            raise RuntimeError("Quantized scoring is not enabled")
+        return self.quantized.predict_proba_bins(bins)
+    
     def predict(
         self,
         age: float,
@@ -173,8 +293,9 @@ class PregnancyRiskPredictor:
             raise RuntimeError(f"Scaler transform failed: {e}. This is critical - model requires scaled features!")
         
         # Predict - model returns encoded class (0=High, 1=Low)
-        prediction_encoded = self.model.predict(features_scaled)[0]
-        probabilities = self.model.predict_proba(features_scaled)[0]
+        # The encoded prediction is the most probable class (same as model.predict)
+        probabilities = self._predict_proba(features_scaled)[0]
+        prediction_encoded = int(self.model.classes_[np.argmax(probabilities)])
         
         if self.debug:
             print(f"\n🔍 DEBUG: Raw model output:")
@@ -220,10 +341,100 @@ class PregnancyRiskPredictor:
                 print(f"   P({class_name}) = {probabilities[i]:.4f}")
         
         # Generate explanation (doesn't affect prediction, just for display)
-        bp_diff = systolic_bp - diastolic_bp
+        explanation = self._build_explanation(
+            systolic_bp=systolic_bp,
+            diastolic_bp=diastolic_bp,
+            bmi=bmi,
+            heart_rate=heart_rate,
+            risk_factors=previous_complications + preexisting_diabetes + gestational_diabetes + mental_health
+        )
+        
+        result = {
+            'risk_level': risk_level,
+            'confidence': confidence,
+            'probabilities': prob_dict,
+            'explanation': explanation
+        }
+        
+        if self.debug:
+            print(f"\n✅ Final prediction: {risk_level} (confidence: {confidence:.2%})")
+        
+        return result
+    
+    def predict_batch(self, rows: List[dict]) -> List[dict]:
+        """
+        Predict pregnancy risk level for many patients at once
+        
+        Args:
+            rows: list of dicts with the same keys as predict() arguments
+        
+        Returns:
+            list of dicts with keys: risk_level, confidence, probabilities, explanation
+            (same values as calling predict() on each row)
+        
+        Batches of up to quantized_max_rows rows (without the cascade) are scored on
+        quantized bins; larger batches use the scaled float64 path.
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Model or scaler not loaded")
+        if not rows:
+            return []
+        
+        base = np.array(
+            [[row[name] for name in BASE_FEATURE_NAMES] for row in rows],
+            dtype=np.float64
+        )
+        features = engineer_features_batch(base)
+        
+        # One predict_proba pass; the encoded prediction is the argmax (same as model.predict)
+        if self.cascade is None and self._use_quantized(len(rows)):
+            # Compact path: features are scaled and quantized chunk by chunk, so the
+            # model only sees uint8/uint16 bins (no scaled float64 copy is kept)
+            probabilities = self.predict_proba_quantized(self.quantize_features(features))
+        else:
+            # CRITICAL: Scale features - model was trained on scaled features
+            features_scaled = self.scaler.transform(features)
+            probabilities = self._predict_proba(features_scaled)
+        predictions_encoded = self.model.classes_.take(np.argmax(probabilities, axis=1))
+        
+        # Decode with the label encoder: 0=High, 1=Low
+        if hasattr(self.label_encoder, 'inverse_transform'):
+            risk_levels = self.label_encoder.inverse_transform(predictions_encoded)
+        else:
+            risk_levels = np.where(predictions_encoded == 0, 'High', 'Low')
+        
+        classes = list(self.label_encoder.classes_)
+        results = []
+        for i, row in enumerate(rows):
+            encoded = int(predictions_encoded[i])
+            results.append({
+                'risk_level': str(risk_levels[i]),
+                'confidence': float(probabilities[i, encoded]),
+                'probabilities': {
+                    class_name: float(probabilities[i, j]) for j, class_name in enumerate(classes)
+                },
+                'explanation': self._build_explanation(
+                    systolic_bp=row['systolic_bp'],
+                    diastolic_bp=row['diastolic_bp'],
+                    bmi=row['bmi'],
+                    heart_rate=row['heart_rate'],
+                    risk_factors=features[i, 15]
+                ),
+            })
+        
+        return results
+    
+    @staticmethod
+    def _build_explanation(
+        systolic_bp: float,
+        diastolic_bp: float,
+        bmi: float,
+        heart_rate: float,
+        risk_factors: int
+    ) -> str:
+        """Human-readable summary of the derived features (display only)"""
         high_bp = 1 if (systolic_bp >= 140 or diastolic_bp >= 90) else 0
         high_hr = 1 if heart_rate >= 100 else 0
-        risk_factors = previous_complications + preexisting_diabetes + gestational_diabetes + mental_health
         
         bmi_cat_names = ['Underweight', 'Normal', 'Overweight', 'Obese']
         if bmi < 18.5:
@@ -235,21 +446,9 @@ class PregnancyRiskPredictor:
         else:
             bmi_cat = 3
         
-        explanation = (
-            f"Risk Factors: {risk_factors} | "
+        return (
+            f"Risk Factors: {int(risk_factors)} | "
             f"BP Status: {'High' if high_bp else 'Normal'} | "
             f"HR Status: {'Elevated' if high_hr else 'Normal'} | "
             f"BMI Category: {bmi_cat_names[bmi_cat]}"
         )
-        
-        result = {
-            'risk_level': risk_level,
-            'confidence': confidence,
-            'probabilities': prob_dict,
-            'explanation': explanation
-        }
-        
-        if self.debug:
-            print(f"\n✅ Final prediction: {risk_level} (confidence: {confidence:.2%})")
-        
-        return result
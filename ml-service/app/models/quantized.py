@@ -0,0 +1,258 @@
+"""
+Quantized forest evaluator for bulk scoring
+Every split in the fitted forest compares one feature against a threshold, and each
+feature only has a limited set of distinct thresholds. A scaled feature value can
+therefore be replaced by its bin index - the number of split thresholds below it -
+without changing any decision:
+    x <= thresholds[k]   <=>   bin(x) <= k
+
+Rows are stored as uint8/uint16 bins in a structure-of-arrays layout (one contiguous
+array per feature, shape (n_features, n_rows)), 1-2 bytes per feature instead of the
+float64 feature + scaled copies of the float path.
+
+Trees are evaluated with leaf bitmasks (QuickScorer): for each feature and bin, a
+precomputed table holds, per tree, the leaves still reachable after every split on
+that feature whose outcome is known from the bin (features with few bins share one
+joint table). ANDing the tables leaves the exit leaf as the lowest set bit.
+Probabilities are accumulated tree by tree in the same order as sklearn, so results
+are identical to model.predict_proba.
+"""
+
+import numpy as np
+
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+ALL_BITS = np.uint64(WORD_MASK)
+
+# Rows evaluated at once; bounds the (rows, trees, words) bitmask buffer
+DEFAULT_CHUNK_ROWS = 512
+
+# Largest joint bin count for a group of features sharing one lookup table
+DEFAULT_MAX_GROUP_BINS = 1024
+
+
+def _bin_dtype(max_bins: int):
+    if max_bins <= np.iinfo(np.uint8).max + 1:
+        return np.uint8
+    if max_bins <= np.iinfo(np.uint16).max + 1:
+        return np.uint16
+    return np.uint32
+
+
+def _leaf_ranges(tree):
+    """
+    Leaf numbering (left to right) and the leaf range covered by each node
+
+    Returns (leaf_ids, lo, hi): leaf_ids[node] is the leaf number (-1 for split nodes),
+    and the leaves under a node are lo[node] .. hi[node] - 1.
+    """
+    left, right = tree.children_left, tree.children_right
+    n_nodes = tree.node_count
+    leaf_ids = np.full(n_nodes, -1, dtype=np.int64)
+    lo = np.zeros(n_nodes, dtype=np.int64)
+    hi = np.zeros(n_nodes, dtype=np.int64)
+
+    # Pre-order walk, left child first, so leaves are numbered left to right
+    order = []
+    stack = [0]
+    n_leaves = 0
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        if left[node] == -1:
+            leaf_ids[node] = n_leaves
+            lo[node], hi[node] = n_leaves, n_leaves + 1
+            n_leaves += 1
+        else:
+            stack.append(right[node])
+            stack.append(left[node])
+
+    for node in reversed(order):
+        if left[node] != -1:
+            lo[node], hi[node] = lo[left[node]], hi[right[node]]
+    return leaf_ids, lo, hi
+
+
+class QuantizedForest:
+    """
+    Bin-based evaluator for a fitted sklearn forest classifier
+    (RandomForestClassifier / ExtraTreesClassifier, single output)
+
+    quantize(features_scaled) -> bins, shape (n_features, n_rows)
+    predict_proba_bins(bins)   -> (n_rows, n_classes), same as model.predict_proba
+    predict_proba(features_scaled) does both, so it can stand in for the model.
+    """
+
+    def __init__(
+        self,
+        model,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        max_group_bins: int = DEFAULT_MAX_GROUP_BINS
+    ):
+        estimators = getattr(model, 'estimators_', None)
+        if estimators is None or not all(hasattr(e, 'tree_') for e in estimators):
+            raise ValueError(f"{type(model).__name__} is not a fitted tree forest")
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be quantized")
+
+        self.classes_ = model.classes_
+        self.n_features = model.n_features_in_
+        self.n_classes = len(model.classes_)
+        self.n_trees = len(estimators)
+        self.chunk_rows = max(1, chunk_rows)
+        trees = [e.tree_ for e in estimators]
+
+        # Sorted distinct split thresholds per feature
+        self.thresholds = []
+        for feature in range(self.n_features):
+            values = [t.threshold[t.feature == feature] for t in trees]
+            self.thresholds.append(np.unique(np.concatenate(values)).astype(np.float64))
+        self.bin_dtype = _bin_dtype(max(len(t) for t in self.thresholds) + 1)
+        # sklearn compares float32 inputs with float64 thresholds. For a float32 x,
+        # x <= t exactly when x <= t rounded down to float32, so bins can be found
+        # with a float32 search (rounding may merge neighbouring thresholds, which
+        # does not change the count of thresholds below x).
+        self.thresholds_f32 = []
+        for thr in self.thresholds:
+            rounded = thr.astype(np.float32)
+            rounded_up = rounded.astype(np.float64) > thr
+            rounded[rounded_up] = np.nextafter(rounded[rounded_up], np.float32(-np.inf))
+            self.thresholds_f32.append(rounded)
+
+        leaf_counts = [t.n_leaves for t in trees]
+        self.n_words = (max(leaf_counts) + WORD_BITS - 1) // WORD_BITS
+
+        # tables[f][b, tree, word]: leaves not ruled out by splits on feature f for bin b
+        tables = [
+            np.full((len(thr) + 1, self.n_trees, self.n_words), ALL_BITS, dtype=np.uint64)
+            for thr in self.thresholds
+        ]
+        # Leaf probabilities, normalized per tree exactly like DecisionTreeClassifier.predict_proba,
+        # stored per class: leaf_proba[class, global leaf index]
+        self.leaf_offsets = np.concatenate([[0], np.cumsum(leaf_counts)[:-1]]).astype(np.int64)
+        self.leaf_proba = np.zeros((self.n_classes, sum(leaf_counts)), dtype=np.float64)
+
+        for tree_index, tree in enumerate(trees):
+            leaf_ids, lo, hi = _leaf_ranges(tree)
+            leaves = np.flatnonzero(leaf_ids >= 0)
+            proba = tree.value[leaves, 0, :self.n_classes].astype(np.float64)
+            normalizer = proba.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer[:, np.newaxis]
+            self.leaf_proba[:, self.leaf_offsets[tree_index] + leaf_ids[leaves]] = proba.T
+
+            for node in np.flatnonzero(leaf_ids < 0):
+                feature = tree.feature[node]
+                k = int(np.searchsorted(self.thresholds[feature], tree.threshold[node]))
+                # bin > k: the split goes right, so the left subtree's leaves are unreachable
+                left = tree.children_left[node]
+                cleared = ((1 << int(hi[left] - lo[left])) - 1) << int(lo[left])
+                for word in range(self.n_words):
+                    bits = (cleared >> (word * WORD_BITS)) & WORD_MASK
+                    if bits:
+                        tables[feature][k + 1:, tree_index, word] &= np.uint64(~bits & WORD_MASK)
+
+        # Features never split on do not affect the result. The others are packed into
+        # groups whose joint bin count stays small, with one combined table per group,
+        # so a row needs one table lookup per group instead of one per feature.
+        used = sorted(
+            (f for f, thr in enumerate(self.thresholds) if len(thr)),
+            key=lambda f: len(self.thresholds[f])
+        )
+        self.used_features = sorted(used)
+        self.groups = []
+        for feature in used:
+            n_bins = len(self.thresholds[feature]) + 1
+            if self.groups and self.groups[-1][1] * n_bins <= max_group_bins:
+                members, size = self.groups[-1]
+                self.groups[-1] = (members + [feature], size * n_bins)
+            else:
+                self.groups.append(([feature], n_bins))
+
+        self.group_tables = []
+        self.group_strides = []
+        for members, size in self.groups:
+            shape = [len(self.thresholds[f]) + 1 for f in members]
+            joint = np.full(shape + [self.n_trees, self.n_words], ALL_BITS, dtype=np.uint64)
+            for axis, feature in enumerate(members):
+                broadcast = [1] * len(members) + [self.n_trees, self.n_words]
+                broadcast[axis] = shape[axis]
+                joint &= tables[feature].reshape(broadcast)
+            self.group_tables.append(joint.reshape(size, self.n_trees * self.n_words))
+            self.group_strides.append([int(np.prod(shape[axis + 1:])) for axis in range(len(members))])
+
+    def quantize(self, features_scaled: np.ndarray) -> np.ndarray:
+        """
+        Bin indices for scaled features, shape (n_features, n_rows), dtype bin_dtype
+
+        Values are rounded to float32 first, as sklearn does before comparing them
+        with the split thresholds.
+        """
+        features_scaled = np.asarray(features_scaled, dtype=np.float32)
+        bins = np.zeros((self.n_features, len(features_scaled)), dtype=self.bin_dtype)
+        for feature in self.used_features:
+            bins[feature] = np.searchsorted(
+                self.thresholds_f32[feature], features_scaled[:, feature], side='left'
+            )
+        return bins
+
+    def _exit_leaves(self, bins: np.ndarray) -> np.ndarray:
+        """Global leaf index per (row, tree)"""
+        reachable = None
+        for (members, _), table, strides in zip(self.groups, self.group_tables, self.group_strides):
+            index = bins[members[0]].astype(np.intp) * strides[0]
+            for feature, stride in zip(members[1:], strides[1:]):
+                index += bins[feature].astype(np.intp) * stride
+            if reachable is None:
+                reachable = table[index]
+            else:
+                reachable &= table[index]
+        if reachable is None:
+            reachable = np.full((bins.shape[1], self.n_trees * self.n_words), ALL_BITS, dtype=np.uint64)
+        reachable = reachable.reshape(bins.shape[1], self.n_trees, self.n_words)
+
+        # The exit leaf is the lowest reachable leaf. Isolate the lowest set bit and read
+        # its position from the float64 exponent (powers of two convert exactly).
+        leaves = None
+        for word in range(self.n_words):
+            bits = reachable[:, :, word]
+            lowest = bits & (~bits + np.uint64(1))
+            position = (lowest.astype(np.float64).view(np.int64) >> 52) - 1023 + word * WORD_BITS
+            if leaves is None:
+                # The exit leaf is always reachable, so with one word every row has a bit set
+                leaves = position if self.n_words == 1 else np.where(bits != 0, position, -1)
+            else:
+                leaves = np.where((leaves < 0) & (bits != 0), position, leaves)
+        return leaves + self.leaf_offsets
+
+    def predict_proba_bins(self, bins: np.ndarray) -> np.ndarray:
+        """Class probabilities for quantized rows (columns ordered like classes_)"""
+        if bins.shape[0] != self.n_features:
+            raise ValueError(f"Expected bins of shape ({self.n_features}, n_rows), got {bins.shape}")
+        n_rows = bins.shape[1]
+        probabilities = np.zeros((n_rows, self.n_classes), dtype=np.float64)
+        for start in range(0, n_rows, self.chunk_rows):
+            stop = min(start + self.chunk_rows, n_rows)
+            leaves = self._exit_leaves(bins[:, start:stop])
+            for class_index in range(self.n_classes):
+                tree_proba = np.take(self.leaf_proba[class_index], leaves)
+                # Running sum over trees, in estimator order, like the forest does
+                np.add.accumulate(tree_proba, axis=1, out=tree_proba)
+                probabilities[start:stop, class_index] = tree_proba[:, -1]
+        probabilities /= self.n_trees
+        return probabilities
+
+    def predict_proba(self, features_scaled: np.ndarray) -> np.ndarray:
+        """Drop-in replacement for model.predict_proba on scaled features"""
+        return self.predict_proba_bins(self.quantize(features_scaled))
+
+    def describe(self) -> dict:
+        table_bytes = sum(table.nbytes for table in self.group_tables) + self.leaf_proba.nbytes
+        return {
+            'bin_dtype': np.dtype(self.bin_dtype).name,
+            'bytes_per_row': self.n_features * np.dtype(self.bin_dtype).itemsize,
+            'thresholds_per_feature': [len(thr) for thr in self.thresholds],
+            'trees': self.n_trees,
+            'table_groups': [members for members, _ in self.groups],
+            'table_bytes': int(table_bytes),
+        }
@@ -0,0 +1,52 @@
+"""
+medicalrisk.csv column mapping and API input bounds
+The CSV itself is parsed only by app/utils/feature_store.py (load_features,
+load_patient_records).
+"""
+
+from pathlib import Path
+
+DEFAULT_CSV_PATH = Path(__file__).parent.parent.parent / "medicalrisk.csv"
+
+# CSV column -> predict() / API field name (same order as BASE_FEATURE_NAMES)
+CSV_COLUMN_MAP = {
+    'Age': 'age',
+    'Systolic BP': 'systolic_bp',
+    'Diastolic': 'diastolic_bp',
+    'BS': 'blood_sugar',
+    'Body Temp': 'body_temp',
+    'BMI': 'bmi',
+    'Previous Complications': 'previous_complications',
+    'Preexisting Diabetes': 'preexisting_diabetes',
+    'Gestational Diabetes': 'gestational_diabetes',
+    'Mental Health': 'mental_health',
+    'Heart Rate': 'heart_rate',
+}
+
+INTEGER_FIELDS = {
+    'previous_complications',
+    'preexisting_diabetes',
+    'gestational_diabetes',
+    'mental_health',
+}
+
+# Input ranges accepted by PredictionRequest in app/main.py
+INPUT_BOUNDS = {
+    'age': (15, 50),
+    'systolic_bp': (80, 180),
+    'diastolic_bp': (40, 120),
+    'blood_sugar': (3, 15),
+    'body_temp': (95, 104),
+    'bmi': (10, 50),
+    'previous_complications': (0, 1),
+    'preexisting_diabetes': (0, 1),
+    'gestational_diabetes': (0, 1),
+    'mental_health': (0, 1),
+    'heart_rate': (40, 120),
+}
+
+
+def is_in_bounds(record: dict) -> bool:
+    """Check if a record would pass the API input validation"""
+    return all(low <= record[name] <= high for name, (low, high) in INPUT_BOUNDS.items())
+
@@ -106,3 +106,57 @@ def engineer_features(
     
     return all_features
 
+
+
+# Order of the 11 base inputs (same order as engineer_features arguments)
+BASE_FEATURE_NAMES = [
+    'age',
+    'systolic_bp',
+    'diastolic_bp',
+    'blood_sugar',
+    'body_temp',
+    'bmi',
+    'previous_complications',
+    'preexisting_diabetes',
+    'gestational_diabetes',
+    'mental_health',
+    'heart_rate',
+]
+
+def engineer_features_batch(base_features: np.ndarray) -> np.ndarray:
+    """
+    Vectorized engineer_features for many rows at once
+    
+    Args:
+        base_features: array of shape (n_rows, 11) in BASE_FEATURE_NAMES order
+    
+    Returns: numpy array of shape (n_rows, 16), identical to stacking
+             engineer_features() row by row
+    """
+    base = np.asarray(base_features, dtype=np.float64)
+    if base.ndim != 2 or base.shape[1] != len(BASE_FEATURE_NAMES):
+        raise ValueError(
+            f"Expected base features of shape (n_rows, {len(BASE_FEATURE_NAMES)}), got {base.shape}"
+        )
+    
+    systolic_bp = base[:, 1]
+    diastolic_bp = base[:, 2]
+    bmi = base[:, 5]
+    heart_rate = base[:, 10]
+    
+    # Same thresholds as categorize_bmi / is_high_bp / is_high_hr
+    bp_diff = systolic_bp - diastolic_bp
+    bmi_cat = np.select([bmi < 18.5, bmi < 24.9, bmi < 29.9], [0, 1, 2], default=3)
+    high_bp = ((systolic_bp >= 140) | (diastolic_bp >= 90)).astype(np.int64)
+    high_hr = (heart_rate >= 100).astype(np.int64)
+    risk_factors = base[:, 6] + base[:, 7] + base[:, 8] + base[:, 9]
+    
+    derived_features = np.column_stack([
+        bp_diff,
+        bmi_cat,
+        high_bp,
+        high_hr,
+        risk_factors,
+    ])
+    
+    return np.hstack([base, derived_features])
@@ -0,0 +1,238 @@
+"""
+Cached, memory-mapped engineered feature matrix for training and benchmarks
+
+medicalrisk.csv is parsed and feature-engineered once; the 16-column matrix and labels
+are written as .npy files under .feature_cache/<csv stem>-<key>/, where the key hashes
+the CSV contents and the feature-engineering code. Later runs memory-map the cached arrays and
+only rebuild when either input changes. The CSV is only re-hashed when its size or
+modification time differs from the ones recorded in the entry's meta.json.
+
+This is the only CSV parser: load_patient_records() returns API-style records from the
+same cached matrix for warm-up, load tests and test scripts.
+"""
+
+import os
+import csv
+import json
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.utils import feature_engineering
+from app.utils.dataset import CSV_COLUMN_MAP, DEFAULT_CSV_PATH, INTEGER_FIELDS, is_in_bounds
+from app.utils.feature_engineering import BASE_FEATURE_NAMES, engineer_features_batch
+
+# Bump when the cached layout or the CSV -> feature mapping changes
+FEATURE_CODE_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent.parent / ".feature_cache"
+
+# Training column names, in model feature order
+FEATURE_COLUMNS = list(CSV_COLUMN_MAP) + ['BP_diff', 'BMI_cat', 'High_BP', 'High_HR', 'Risk_Factors']
+
+# Encoded labels match the label encoder (alphabetical): High=0, Low=1; -1 = missing
+LABEL_CODES = {'High': 0, 'Low': 1}
+LABEL_NAMES = {code: name for name, code in LABEL_CODES.items()}
+MISSING_LABEL = -1
+
+
+class CachedFeatures:
+    """
+    Engineered features for every CSV row
+
+    features: (n_rows, 16) float64, memory-mapped (in memory if the cache is not
+              writable); NaN where the CSV value is missing
+    labels:   (n_rows,) int8, High=0, Low=1, -1 if 'Risk Level' is missing
+    complete: (n_rows,) bool, True if all 11 input columns are present
+    """
+
+    def __init__(self, features: np.ndarray, labels: np.ndarray, complete: np.ndarray, key: str, path: Path):
+        self.features = features
+        self.labels = labels
+        self.complete = complete
+        self.key = key
+        self.path = path
+
+    def __len__(self):
+        return len(self.labels)
+
+    def labelled(self):
+        """(features, labels) for complete rows with a label"""
+        mask = self.complete & (self.labels != MISSING_LABEL)
+        return self.features[mask], np.asarray(self.labels[mask])
+
+    def to_records(self, rows: Optional[np.ndarray] = None) -> List[dict]:
+        """Complete rows as predict() keyword dicts"""
+        mask = np.asarray(self.complete if rows is None else rows & self.complete)
+        base = np.asarray(self.features[mask, :len(BASE_FEATURE_NAMES)])
+        records = []
+        for values in base.tolist():
+            records.append({
+                name: int(value) if name in INTEGER_FIELDS else value
+                for name, value in zip(BASE_FEATURE_NAMES, values)
+            })
+        return records
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _csv_digest(csv_path: Path, cache_dir: Path, stat: os.stat_result) -> str:
+    """
+    SHA-256 of the CSV, reused from a cache entry's meta.json when the file's
+    path, size and mtime are unchanged (avoids reading large CSVs on every load)
+    """
+    for meta_path in cache_dir.glob(f"{csv_path.stem}-*/meta.json"):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if (
+            meta.get('csv_path') == str(csv_path)
+            and meta.get('csv_size') == stat.st_size
+            and meta.get('csv_mtime_ns') == stat.st_mtime_ns
+            and meta.get('csv_sha256')
+        ):
+            return meta['csv_sha256']
+    return _file_digest(csv_path)
+
+
+def cache_key(csv_path: Path, csv_digest: Optional[str] = None) -> str:
+    """Hash of the CSV contents, the feature-engineering source and FEATURE_CODE_VERSION"""
+    digest = hashlib.sha256()
+    digest.update((csv_digest or _file_digest(csv_path)).encode())
+    digest.update(_file_digest(Path(feature_engineering.__file__)).encode())
+    digest.update(_file_digest(Path(__file__)).encode())
+    digest.update(str(FEATURE_CODE_VERSION).encode())
+    return digest.hexdigest()[:16]
+
+
+def _parse_csv(csv_path: Path):
+    """Base features (NaN for missing values) and encoded labels"""
+    base_rows = []
+    labels = []
+    with open(csv_path, newline='') as f:
+        for row in csv.DictReader(f):
+            base_rows.append([
+                float(row[column]) if row.get(column, '').strip() else np.nan
+                for column in CSV_COLUMN_MAP
+            ])
+            labels.append(LABEL_CODES.get(row.get('Risk Level', '').strip(), MISSING_LABEL))
+    base = np.array(base_rows, dtype=np.float64).reshape(-1, len(CSV_COLUMN_MAP))
+    return base, np.array(labels, dtype=np.int8)
+
+
+def build_features(csv_path: Path):
+    """Parse the CSV and engineer all 16 features (no caching)"""
+    base, labels = _parse_csv(csv_path)
+    features = engineer_features_batch(base)
+    # Missing BMI falls in no category; match the pandas derivation used for the
+    # scaler in generate_artifacts.py (BMI_cat stays 0)
+    features[np.isnan(base[:, 5]), 12] = 0
+    complete = ~np.isnan(base).any(axis=1)
+    return features, labels, complete
+
+
+def load_features(
+    csv_path: Optional[Path] = None,
+    cache_dir: Optional[Path] = None,
+    rebuild: bool = False
+) -> CachedFeatures:
+    """
+    Memory-map the cached feature matrix for csv_path, building it if needed
+
+    Args:
+        csv_path: source CSV (default: medicalrisk.csv)
+        cache_dir: cache root (default: ml-service/.feature_cache)
+        rebuild: ignore any existing cache entry
+    """
+    csv_path = Path(csv_path) if csv_path else DEFAULT_CSV_PATH
+    cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+    # Stat before hashing, so a concurrent edit is detected on the next load
+    csv_stat = csv_path.stat()
+    csv_digest = _file_digest(csv_path) if rebuild else _csv_digest(csv_path, cache_dir, csv_stat)
+    key = cache_key(csv_path, csv_digest)
+    entry_dir = cache_dir / f"{csv_path.stem}-{key}"
+
+    if rebuild or not (entry_dir / "meta.json").exists():
+        features, labels, complete = build_features(csv_path)
+
+        # Write to a temporary directory and rename, so readers never see a partial entry
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_dir = Path(tempfile.mkdtemp(prefix=f".{csv_path.stem}-", dir=cache_dir))
+        except OSError:
+            # Read-only deployment (e.g. the service container): use the arrays uncached
+            return CachedFeatures(features, labels, complete, key=key, path=None)
+        np.save(tmp_dir / "features.npy", features)
+        np.save(tmp_dir / "labels.npy", labels)
+        np.save(tmp_dir / "complete.npy", complete)
+        with open(tmp_dir / "meta.json", "w") as f:
+            json.dump({
+                'csv_path': str(csv_path),
+                'csv_size': csv_stat.st_size,
+                'csv_mtime_ns': csv_stat.st_mtime_ns,
+                'csv_sha256': csv_digest,
+                'rows': int(len(labels)),
+                'columns': FEATURE_COLUMNS,
+                'feature_code_version': FEATURE_CODE_VERSION,
+            }, f, indent=2)
+
+        if entry_dir.exists():
+            shutil.rmtree(entry_dir)
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # Another process finished the same entry first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        # Drop stale entries for the same CSV
+        for stale in cache_dir.glob(f"{csv_path.stem}-*"):
+            if stale != entry_dir and len(stale.name) == len(entry_dir.name):
+                shutil.rmtree(stale, ignore_errors=True)
+
+    return CachedFeatures(
+        features=np.load(entry_dir / "features.npy", mmap_mode='r'),
+        labels=np.load(entry_dir / "labels.npy", mmap_mode='r'),
+        complete=np.load(entry_dir / "complete.npy", mmap_mode='r'),
+        key=key,
+        path=entry_dir,
+    )
+
+
+def load_patient_records(
+    csv_path: Optional[Path] = None,
+    in_bounds_only: bool = False,
+    limit: Optional[int] = None
+) -> Tuple[List[dict], List[Optional[str]]]:
+    """
+    CSV rows as predict() keyword dicts, read from the cached feature matrix
+
+    Rows with a missing feature value are skipped (rows with a missing
+    'Risk Level' are kept, with label None).
+
+    Returns:
+        (records, labels) where labels are 'High'/'Low'/None
+    """
+    cached = load_features(csv_path)
+    rows = np.flatnonzero(cached.complete)
+    records = cached.to_records()
+    labels = [LABEL_NAMES.get(int(code)) for code in np.asarray(cached.labels)[rows]]
+
+    if in_bounds_only:
+        kept = [i for i, record in enumerate(records) if is_in_bounds(record)]
+        records = [records[i] for i in kept]
+        labels = [labels[i] for i in kept]
+    if limit is not None:
+        records, labels = records[:limit], labels[:limit]
+    return records, labels
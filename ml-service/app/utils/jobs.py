@@ -0,0 +1,531 @@
+"""
+Background scoring jobs with a local, restart-safe job store
+
+A job scores a dataset (inline rows or a server-side CSV/JSONL file) in chunks through
+PregnancyRiskPredictor.predict_batch (chunks up to ML_QUANTIZED_MAX_ROWS rows are scored
+on the compact uint8/uint16 bin layout). Progress and every finished chunk's results are
+committed to SQLite in one transaction, so after a crash a job resumes from the last
+finished chunk. A background thread heartbeats while a worker holds a job; jobs whose
+heartbeat goes stale are picked up again by any worker. Progress is only written by the
+worker that currently owns the job, so a worker that lost its job to a takeover stops
+instead of counting the same rows again.
+"""
+
+import os
+import csv
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+from app.utils.dataset import CSV_COLUMN_MAP, INTEGER_FIELDS, is_in_bounds
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+DEFAULT_JOB_DIR = Path(__file__).parent.parent.parent / ".jobs"
+
+# Lower bound on the heartbeat interval (stale_seconds / 3)
+MIN_HEARTBEAT_SECONDS = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    source TEXT NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    total_rows INTEGER,
+    done_rows INTEGER NOT NULL DEFAULT 0,
+    next_chunk INTEGER NOT NULL DEFAULT 0,
+    failed_rows INTEGER NOT NULL DEFAULT 0,
+    scoring_seconds REAL NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    results TEXT NOT NULL,
+    PRIMARY KEY (job_id, chunk_index)
+);
+"""
+
+
+class JobError(Exception):
+    """Invalid job request (bad file reference, unknown job, ...)"""
+
+
+# ---------------------------------------------------------------------------
+# Job inputs
+# ---------------------------------------------------------------------------
+
+def _parse_record(row) -> dict:
+    """
+    Normalize one input row (API field names or medicalrisk.csv column names)
+
+    row is a CSV dict or a raw JSONL line. Raises ValueError for malformed JSON,
+    non-object lines and missing, non-numeric or out-of-bounds values.
+    """
+    if isinstance(row, str):
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise ValueError("row is not a JSON object")
+    record = {}
+    for column, name in CSV_COLUMN_MAP.items():
+        value = row.get(name, row.get(column))
+        if value is None or (isinstance(value, str) and not value.strip()):
+            raise ValueError(f"missing value for {name}")
+        value = float(value)
+        record[name] = int(value) if name in INTEGER_FIELDS else value
+    if not is_in_bounds(record):
+        raise ValueError("value outside the accepted input range")
+    return record
+
+
+def iter_source_rows(source: dict, job_dir: Path, skip: int = 0) -> Iterator:
+    """
+    Raw input rows of a job, starting after `skip` rows
+
+    CSV rows are dicts; JSONL rows are the unparsed lines, so a malformed line
+    only fails its own row (see _parse_record).
+    """
+    if source['type'] == 'inline':
+        path = job_dir / source['path']
+    else:
+        path = Path(source['path'])
+
+    with open(path, newline='') as f:
+        if path.suffix == '.csv':
+            rows = csv.DictReader(f)
+        else:
+            rows = (line for line in f if line.strip())
+        for index, row in enumerate(rows):
+            if index >= skip:
+                yield row
+
+
+def count_source_rows(source: dict, job_dir: Path) -> int:
+    return sum(1 for _ in iter_source_rows(source, job_dir))
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+class JobStore:
+    """SQLite-backed job metadata and per-chunk results"""
+
+    def __init__(self, job_dir: Optional[Path] = None):
+        self.job_dir = Path(job_dir) if job_dir else DEFAULT_JOB_DIR
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.job_dir / "jobs.db"
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success, rolls back on error and always closes"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(
+        self,
+        source: dict,
+        chunk_size: int,
+        total_rows: Optional[int] = None,
+        job_id: Optional[str] = None
+    ) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, source, chunk_size, total_rows, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(source), chunk_size, total_rows, time.time())
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, limit: int = 50) -> List[dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim(self, worker: str, stale_seconds: float) -> Optional[dict]:
+        """
+        Atomically take the oldest queued job, or a running job whose worker
+        stopped heartbeating (crashed/restarted process)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? "
+                "OR (status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now - stale_seconds)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, heartbeat_at = ?, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (RUNNING, worker, now, now, row['id'])
+            )
+        job = dict(row)
+        job['status'] = RUNNING
+        job['worker'] = worker
+        return job
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """Refresh a running job's heartbeat; False if worker no longer owns the job"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                (time.time(), job_id, worker, RUNNING)
+            )
+        return cursor.rowcount > 0
+
+    def set_total_rows(self, job_id: str, total_rows: int):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET total_rows = ? WHERE id = ?", (total_rows, job_id))
+
+    def save_chunk(
+        self,
+        job_id: str,
+        worker: str,
+        chunk_index: int,
+        results: List[dict],
+        failed_rows: int,
+        seconds: float
+    ) -> bool:
+        """
+        Store a finished chunk and advance progress in one transaction
+
+        Only applies if worker still owns the job and chunk_index is its next chunk;
+        returns False otherwise (the job was taken over, finished or cancelled), and
+        nothing is written. done_rows is derived from the chunk boundary.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET next_chunk = ?, done_rows = chunk_size * ? + ?, "
+                "failed_rows = failed_rows + ?, scoring_seconds = scoring_seconds + ?, "
+                "heartbeat_at = ? WHERE id = ? AND worker = ? AND status = ? AND next_chunk = ?",
+                (chunk_index + 1, chunk_index, len(results), failed_rows, seconds, time.time(),
+                 job_id, worker, RUNNING, chunk_index)
+            )
+            if cursor.rowcount == 0:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO job_results (job_id, chunk_index, results) VALUES (?, ?, ?)",
+                (job_id, chunk_index, json.dumps(results))
+            )
+        return True
+
+    def finish(self, job_id: str, worker: str, status: str, error: Optional[str] = None) -> bool:
+        """Mark a job owned by worker as finished; False if worker no longer owns it"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, worker = NULL "
+                "WHERE id = ? AND worker = ?",
+                (status, error, time.time(), job_id, worker)
+            )
+        return cursor.rowcount > 0
+
+    def requeue(self, job_id: str, worker: str):
+        """Hand a running job back to the queue (clean shutdown); progress is kept"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL WHERE id = ? AND worker = ? AND status = ?",
+                (QUEUED, job_id, worker, RUNNING)
+            )
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Cancel a job; queued jobs stop at once, running jobs after their current chunk"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN (?, ?)",
+                (job_id, QUEUED, RUNNING)
+            )
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED)
+            )
+        return cursor.rowcount > 0
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        return bool(job and job['cancel_requested'])
+
+    def iter_results(self, job_id: str) -> Iterator[dict]:
+        """
+        Result rows of all finished chunks, in input order
+
+        Every chunk is fetched on its own short-lived connection, so the generator
+        may be resumed from any thread (StreamingResponse iterates it in a thread pool;
+        SQLite connections cannot be used across threads).
+        """
+        chunk_index = -1
+        while True:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT chunk_index, results FROM job_results "
+                    "WHERE job_id = ? AND chunk_index > ? ORDER BY chunk_index LIMIT 1",
+                    (job_id, chunk_index)
+                ).fetchone()
+            if row is None:
+                return
+            chunk_index = row['chunk_index']
+            yield from json.loads(row['results'])
+
+
+def describe_job(job: dict) -> dict:
+    """Public view of a job (status/progress endpoint)"""
+    total = job['total_rows']
+    seconds = job['scoring_seconds']
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'total_rows': total,
+        'done_rows': job['done_rows'],
+        'failed_rows': job['failed_rows'],
+        'progress': round(job['done_rows'] / total, 4) if total else None,
+        'rows_per_second': round(job['done_rows'] / seconds, 1) if seconds else None,
+        'chunks_done': job['next_chunk'],
+        'chunk_size': job['chunk_size'],
+        'cancel_requested': bool(job['cancel_requested']),
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'error': job['error'],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+class JobRunner:
+    """
+    Worker pool that scores jobs, configured from environment variables by from_env():
+        ML_JOB_DIR            - job store directory (default: ml-service/.jobs)
+        ML_JOB_INPUT_DIR      - directory file references must live in (default: ml-service)
+        ML_JOB_WORKERS        - worker threads (default: 1)
+        ML_JOB_CHUNK_SIZE     - rows per chunk (default: 1000)
+        ML_JOB_STALE_SECONDS  - heartbeat age after which a running job is resumed (default: 60)
+    """
+
+    def __init__(
+        self,
+        predictor,
+        store: JobStore,
+        input_dir: Optional[Path] = None,
+        workers: int = 1,
+        chunk_size: int = 1000,
+        stale_seconds: float = 60,
+        poll_interval: float = 0.5,
+        before_chunk: Optional[Callable[[], None]] = None
+    ):
+        self.predictor = predictor
+        self.store = store
+        self.input_dir = Path(input_dir or Path(__file__).parent.parent.parent).resolve()
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.stale_seconds = stale_seconds
+        self.poll_interval = poll_interval
+        # Called before every chunk (e.g. to yield to interactive requests)
+        self.before_chunk = before_chunk
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._worker_prefix = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    @classmethod
+    def from_env(cls, predictor, before_chunk: Optional[Callable[[], None]] = None) -> "JobRunner":
+        job_dir = os.getenv("ML_JOB_DIR")
+        input_dir = os.getenv("ML_JOB_INPUT_DIR")
+        return cls(
+            predictor,
+            JobStore(Path(job_dir) if job_dir else None),
+            input_dir=Path(input_dir) if input_dir else None,
+            workers=int(os.getenv("ML_JOB_WORKERS", 1)),
+            chunk_size=int(os.getenv("ML_JOB_CHUNK_SIZE", 1000)),
+            stale_seconds=float(os.getenv("ML_JOB_STALE_SECONDS", 60)),
+            before_chunk=before_chunk
+        )
+
+    # -- submission ---------------------------------------------------------
+
+    def submit_rows(self, rows: List[dict], chunk_size: Optional[int] = None) -> str:
+        """Submit an inline dataset (copied into the job store)"""
+        job_id = uuid.uuid4().hex
+        job_path = self.store.job_dir / job_id
+        job_path.mkdir(parents=True, exist_ok=True)
+        with open(job_path / "input.jsonl", "w") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+        source = {'type': 'inline', 'path': f"{job_id}/input.jsonl"}
+        self.store.create(source, chunk_size or self.chunk_size, len(rows), job_id=job_id)
+        self._wake_event.set()
+        return job_id
+
+    def submit_file(self, file_path: str, chunk_size: Optional[int] = None) -> str:
+        """Submit a reference to a CSV/JSONL file inside the input directory"""
+        path = Path(file_path)
+        if not path.is_absolute():
+            path = self.input_dir / path
+        path = path.resolve()
+        if self.input_dir not in path.parents:
+            raise JobError(f"File must be inside {self.input_dir}")
+        if not path.is_file():
+            raise JobError(f"File not found: {file_path}")
+        if path.suffix not in ('.csv', '.jsonl'):
+            raise JobError("Only .csv and .jsonl files are supported")
+
+        # Rows are counted by the worker that claims the job, not on submission
+        source = {'type': 'file', 'path': str(path)}
+        job_id = self.store.create(source, chunk_size or self.chunk_size)
+        self._wake_event.set()
+        return job_id
+
+    # -- workers ------------------------------------------------------------
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work_loop, args=(f"{self._worker_prefix}-{i}",),
+                name=f"job-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10):
+        self._stop_event.set()
+        self._wake_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work_loop(self, worker: str):
+        while not self._stop_event.is_set():
+            job = self.store.claim(worker, self.stale_seconds)
+            if job is None:
+                self._wake_event.wait(self.poll_interval)
+                self._wake_event.clear()
+                continue
+            try:
+                self.run_job(job)
+            except Exception as e:
+                print(f"❌ Scoring job {job['id']} failed: {e}")
+                self.store.finish(job['id'], worker, FAILED, error=str(e))
+
+    @contextmanager
+    def _heartbeat(self, job_id: str, worker: str):
+        """
+        Refresh the job's heartbeat from a background thread while the block runs
+        (row counting, before_chunk and long chunks included). Yields an event that
+        is set once worker no longer owns the job.
+        """
+        lost = threading.Event()
+        done = threading.Event()
+        interval = max(self.stale_seconds / 3, MIN_HEARTBEAT_SECONDS)
+
+        def beat():
+            while not done.wait(interval):
+                if not self.store.heartbeat(job_id, worker):
+                    lost.set()
+                    return
+
+        thread = threading.Thread(target=beat, name=f"job-heartbeat-{job_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            done.set()
+            thread.join()
+
+    def run_job(self, job: dict):
+        """Score a job claimed by job['worker'] from its next unfinished chunk to the end"""
+        job_id = job['id']
+        worker = job['worker']
+        chunk_size = job['chunk_size']
+        chunk_index = job['next_chunk']
+        source = json.loads(job['source'])
+
+        with self._heartbeat(job_id, worker) as lost:
+            if job['total_rows'] is None:
+                self.store.set_total_rows(job_id, count_source_rows(source, self.store.job_dir))
+            rows = iter_source_rows(source, self.store.job_dir, skip=chunk_index * chunk_size)
+
+            while not self._stop_event.is_set():
+                if lost.is_set():
+                    print(f"⚠️  Scoring job {job_id} was taken over by another worker")
+                    return
+                if self.store.is_cancel_requested(job_id):
+                    self.store.finish(job_id, worker, CANCELLED)
+                    return
+
+                chunk = []
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        break
+                if not chunk:
+                    self.store.finish(job_id, worker, COMPLETED)
+                    return
+
+                if self.before_chunk is not None:
+                    self.before_chunk()
+
+                start = time.perf_counter()
+                results, failed = self._score_chunk(chunk, first_row=chunk_index * chunk_size)
+                seconds = time.perf_counter() - start
+                if not self.store.save_chunk(job_id, worker, chunk_index, results, failed, seconds):
+                    # Another worker resumed the job (or it was finished); its progress wins
+                    print(f"⚠️  Scoring job {job_id} was taken over by another worker")
+                    return
+                chunk_index += 1
+
+            # Shutting down: another worker (or the next process) resumes from here
+            self.store.requeue(job_id, worker)
+
+    def _score_chunk(self, chunk: List[dict], first_row: int):
+        """Score valid rows in one predict_batch call; invalid rows get an error entry"""
+        records = []
+        positions = []
+        results = [None] * len(chunk)
+        for i, row in enumerate(chunk):
+            try:
+                records.append(_parse_record(row))
+                positions.append(i)
+            except (TypeError, ValueError, AttributeError) as e:
+                results[i] = {'row': first_row + i, 'error': str(e)}
+
+        for i, prediction in zip(positions, self.predictor.predict_batch(records)):
+            results[i] = {'row': first_row + i, **prediction}
+
+        failed = len(chunk) - len(records)
+        return results, failed
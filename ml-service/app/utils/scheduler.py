@@ -0,0 +1,223 @@
+"""
+Priority lanes for prediction work
+Interactive requests (a patient waiting on the risk page) run on their own thread pool
+and always go first. Bulk/batch work is split into chunks on a separate, capped pool
+and yields to interactive work between chunks.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+
+def _percentile(sorted_values: list, pct: float):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+class Lane:
+    """One priority class: a thread pool, a concurrency cap and queue/wait metrics"""
+
+    def __init__(self, name: str, concurrency: int, latency_target_ms: Optional[float] = None):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.latency_target_ms = latency_target_ms
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"lane-{name}")
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.over_target = 0
+        self.wait_ms = deque(maxlen=1000)
+        self.latency_ms = deque(maxlen=1000)
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    @property
+    def busy(self) -> bool:
+        return self.queued > 0 or self.in_flight > 0
+
+    async def run(self, fn: Callable, enqueued_at: float):
+        """Wait for a slot, then run fn on this lane's pool"""
+        with self._lock:
+            self.queued += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            with self._lock:
+                self.queued -= 1
+        started_at = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+            self.wait_ms.append((started_at - enqueued_at) * 1000)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn)
+        finally:
+            self.semaphore.release()
+            with self._lock:
+                self.in_flight -= 1
+
+    def record_done(self, enqueued_at: float):
+        latency_ms = (time.perf_counter() - enqueued_at) * 1000
+        with self._lock:
+            self.completed += 1
+            self.latency_ms.append(latency_ms)
+            if self.latency_target_ms is not None and latency_ms > self.latency_target_ms:
+                self.over_target += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            waits = sorted(self.wait_ms)
+            latencies = sorted(self.latency_ms)
+            metrics = {
+                'concurrency': self.concurrency,
+                'queue_depth': self.queued,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'wait_ms_p50': _percentile(waits, 50),
+                'wait_ms_p95': _percentile(waits, 95),
+                'wait_ms_max': round(waits[-1], 3) if waits else None,
+                'latency_ms_p50': _percentile(latencies, 50),
+                'latency_ms_p95': _percentile(latencies, 95),
+            }
+            if self.latency_target_ms is not None:
+                metrics['latency_target_ms'] = self.latency_target_ms
+                metrics['over_target'] = self.over_target
+        return metrics
+
+
+class PriorityScheduler:
+    """
+    Two-lane scheduler, configured from environment variables by from_env():
+        ML_INTERACTIVE_WORKERS    - threads for interactive predictions (default: 2)
+        ML_INTERACTIVE_TARGET_MS  - interactive latency target for metrics (default: 100)
+        ML_BULK_CONCURRENCY       - bulk chunks running at once (default: 1)
+        ML_BULK_CHUNK_SIZE        - rows per bulk chunk (default: 32)
+        ML_BULK_MAX_YIELD_MS      - longest a bulk chunk waits for interactive work
+                                    to drain before running anyway (default: 50)
+    """
+
+    def __init__(
+        self,
+        interactive_workers: int = 2,
+        interactive_target_ms: float = 100,
+        bulk_concurrency: int = 1,
+        bulk_chunk_size: int = 32,
+        bulk_max_yield_ms: float = 50
+    ):
+        self.lanes = {
+            INTERACTIVE: Lane(INTERACTIVE, interactive_workers, latency_target_ms=interactive_target_ms),
+            BULK: Lane(BULK, bulk_concurrency),
+        }
+        self.bulk_chunk_size = max(1, bulk_chunk_size)
+        self.bulk_max_yield_ms = bulk_max_yield_ms
+        self._lock = threading.Lock()
+        self.bulk_yields = 0
+
+    @classmethod
+    def from_env(cls) -> "PriorityScheduler":
+        return cls(
+            interactive_workers=int(os.getenv("ML_INTERACTIVE_WORKERS", 2)),
+            interactive_target_ms=float(os.getenv("ML_INTERACTIVE_TARGET_MS", 100)),
+            bulk_concurrency=int(os.getenv("ML_BULK_CONCURRENCY", 1)),
+            bulk_chunk_size=int(os.getenv("ML_BULK_CHUNK_SIZE", 32)),
+            bulk_max_yield_ms=float(os.getenv("ML_BULK_MAX_YIELD_MS", 50))
+        )
+
+    @staticmethod
+    def resolve_lane(priority: Optional[str], default: str) -> str:
+        """Lane from an X-Priority header value ('interactive' or 'bulk')"""
+        if priority is None:
+            return default
+        priority = priority.strip().lower()
+        if priority not in LANES:
+            raise ValueError(f"Unknown priority '{priority}' (expected one of {', '.join(LANES)})")
+        return priority
+
+    async def _yield_to_interactive(self):
+        """Let queued/running interactive work finish first (bounded by bulk_max_yield_ms)"""
+        interactive = self.lanes[INTERACTIVE]
+        deadline = time.perf_counter() + self.bulk_max_yield_ms / 1000
+        waited = False
+        while interactive.busy and time.perf_counter() < deadline:
+            waited = True
+            await asyncio.sleep(0.001)
+        if waited:
+            self._record_yield()
+
+    def wait_for_interactive(self):
+        """
+        Blocking version of the bulk yield, for work running outside the event loop
+        (background scoring jobs call this between chunks)
+        """
+        interactive = self.lanes[INTERACTIVE]
+        deadline = time.perf_counter() + self.bulk_max_yield_ms / 1000
+        waited = False
+        while interactive.busy and time.perf_counter() < deadline:
+            waited = True
+            time.sleep(0.001)
+        if waited:
+            self._record_yield()
+
+    def _record_yield(self):
+        # Called from the event loop and from job worker threads
+        with self._lock:
+            self.bulk_yields += 1
+
+    async def run_single(self, fn: Callable, lane: str = INTERACTIVE):
+        """Run one prediction call (fn takes no arguments) in the given lane"""
+        enqueued_at = time.perf_counter()
+        if lane == BULK:
+            await self._yield_to_interactive()
+        result = await self.lanes[lane].run(fn, enqueued_at)
+        self.lanes[lane].record_done(enqueued_at)
+        return result
+
+    async def run_batch(self, fn: Callable[[List], List], rows: List, lane: str = BULK) -> List:
+        """
+        Run fn over rows in the given lane
+
+        Bulk batches are split into bulk_chunk_size chunks; before each chunk the
+        bulk lane yields to interactive work. Interactive batches run in one call.
+        """
+        enqueued_at = time.perf_counter()
+        if lane == INTERACTIVE:
+            result = await self.lanes[INTERACTIVE].run(lambda: fn(rows), enqueued_at)
+            self.lanes[INTERACTIVE].record_done(enqueued_at)
+            return result
+
+        bulk = self.lanes[BULK]
+        results = []
+        for start in range(0, len(rows), self.bulk_chunk_size):
+            chunk = rows[start:start + self.bulk_chunk_size]
+            chunk_enqueued_at = time.perf_counter()
+            await self._yield_to_interactive()
+            results.extend(await bulk.run(lambda chunk=chunk: fn(chunk), chunk_enqueued_at))
+        bulk.record_done(enqueued_at)
+        return results
+
+    def metrics(self) -> dict:
+        with self._lock:
+            bulk_yields = self.bulk_yields
+        return {
+            'lanes': {name: lane.metrics() for name, lane in self.lanes.items()},
+            'bulk_chunk_size': self.bulk_chunk_size,
+            'bulk_yields': bulk_yields,
+        }
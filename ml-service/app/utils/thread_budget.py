@@ -0,0 +1,217 @@
+"""
+CPU thread-budget management for the ML service
+Keeps sklearn/XGBoost (n_jobs/nthread) and OpenMP/BLAS pools inside one explicit budget
+so several workers on one host do not oversubscribe the cores
+"""
+
+import os
+from typing import List, Optional
+
+# Environment variables read by the native thread pools when they start up.
+# Pools that are already loaded are limited through threadpoolctl instead.
+NATIVE_THREAD_ENV_VARS = [
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'BLIS_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+]
+
+
+def available_cpus() -> List[int]:
+    """CPUs this process is allowed to run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_cpu_list(value: str) -> List[int]:
+    """
+    Parse a CPU list such as "0-3,6,8-9" into [0, 1, 2, 3, 6, 8, 9]
+    """
+    cpus = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return sorted(set(cpus))
+
+
+def split_cpus(cpus: List[int], parts: int) -> List[List[int]]:
+    """
+    Split a CPU list into `parts` contiguous slices of (nearly) equal size
+
+    With fewer CPUs than parts, slices wrap around and share CPUs.
+    """
+    if len(cpus) < parts:
+        return [[cpus[i % len(cpus)]] for i in range(parts)]
+    size, extra = divmod(len(cpus), parts)
+    slices = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        slices.append(cpus[start:end])
+        start = end
+    return slices
+
+
+class ThreadBudget:
+    """
+    Thread budget for one worker process
+
+    total_threads is the budget for the whole host/container; it is split evenly
+    between the worker processes so that workers * threads_per_worker never
+    exceeds it.
+
+    Inside a process, concurrent_calls model calls can run at once (interactive
+    lane threads, bulk lane slots and job worker threads), so each call gets
+    model_threads = threads_per_worker // concurrent_calls native threads. The
+    process stays within threads_per_worker unless concurrent_calls exceeds it
+    (every call gets at least one thread).
+
+    cpu_affinity is split the same way: with worker_index set, the worker is pinned
+    to its own contiguous slice of the list; without it, every worker is restricted
+    to the whole list (a process-wide mask shared by the pool, not per-worker pinning).
+    """
+
+    def __init__(
+        self,
+        total_threads: Optional[int] = None,
+        workers: int = 1,
+        cpu_affinity: Optional[List[int]] = None,
+        worker_index: Optional[int] = None,
+        concurrent_calls: int = 1
+    ):
+        self.workers = max(1, int(workers))
+        self.worker_index = worker_index
+        cpus = cpu_affinity if cpu_affinity else available_cpus()
+        self.total_threads = int(total_threads) if total_threads else len(cpus)
+        self.threads_per_worker = max(1, self.total_threads // self.workers)
+        if cpu_affinity and worker_index is not None and self.workers > 1:
+            cpu_affinity = split_cpus(cpu_affinity, self.workers)[worker_index % self.workers]
+        self.cpu_affinity = cpu_affinity
+        self.concurrent_calls = max(1, int(concurrent_calls))
+        self.model_threads = max(1, self.threads_per_worker // self.concurrent_calls)
+        self._limiter = None
+        self._model_threads = {}
+
+    @classmethod
+    def from_env(cls) -> "ThreadBudget":
+        """
+        Build the budget from environment variables:
+            ML_THREAD_BUDGET  - total native threads for all workers (default: available CPUs)
+            WEB_CONCURRENCY   - number of uvicorn worker processes (default: 1)
+            ML_CPU_AFFINITY   - optional CPU list for the worker pool, e.g. "0-7"
+            ML_WORKER_INDEX   - this worker's index (0..WEB_CONCURRENCY-1); with
+                                ML_CPU_AFFINITY, pins the worker to its slice of the list
+        Concurrent model calls per process come from the lane and job settings:
+            ML_INTERACTIVE_WORKERS + ML_BULK_CONCURRENCY + ML_JOB_WORKERS
+        """
+        total_threads = os.getenv("ML_THREAD_BUDGET")
+        workers = os.getenv("WEB_CONCURRENCY", "1")
+        affinity = os.getenv("ML_CPU_AFFINITY")
+        worker_index = os.getenv("ML_WORKER_INDEX")
+        concurrent_calls = (
+            int(os.getenv("ML_INTERACTIVE_WORKERS", 2)) +
+            int(os.getenv("ML_BULK_CONCURRENCY", 1)) +
+            int(os.getenv("ML_JOB_WORKERS", 1))
+        )
+        return cls(
+            total_threads=int(total_threads) if total_threads else None,
+            workers=int(workers),
+            cpu_affinity=parse_cpu_list(affinity) if affinity else None,
+            worker_index=int(worker_index) if worker_index else None,
+            concurrent_calls=concurrent_calls
+        )
+
+    def apply(self, model=None):
+        """
+        Apply the budget to this process and (optionally) a loaded model
+
+        Safe to call again, e.g. after a new model is loaded.
+        """
+        threads = str(self.model_threads)
+        for var in NATIVE_THREAD_ENV_VARS:
+            os.environ[var] = threads
+
+        # Limit BLAS/OpenMP pools that NumPy/SciPy/sklearn have already loaded
+        try:
+            from threadpoolctl import threadpool_limits
+            self._limiter = threadpool_limits(limits=self.model_threads)
+        except ImportError:
+            self._limiter = None
+
+        if self.cpu_affinity and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, self.cpu_affinity)
+
+        if model is not None:
+            self._model_threads = set_model_threads(model, self.model_threads)
+
+    def describe(self) -> dict:
+        """Current thread configuration (exposed in /health)"""
+        pools = []
+        try:
+            from threadpoolctl import threadpool_info
+            pools = [
+                {
+                    'user_api': info.get('user_api'),
+                    'internal_api': info.get('internal_api'),
+                    'num_threads': info.get('num_threads'),
+                }
+                for info in threadpool_info()
+            ]
+        except ImportError:
+            pass
+
+        return {
+            'total_threads': self.total_threads,
+            'workers': self.workers,
+            'threads_per_worker': self.threads_per_worker,
+            'concurrent_calls': self.concurrent_calls,
+            'threads_per_call': self.model_threads,
+            'worker_index': self.worker_index,
+            'cpu_affinity': available_cpus() if self.cpu_affinity else None,
+            'model_threads': self._model_threads,
+            'native_pools': pools,
+        }
+
+
+def set_model_threads(model, threads: int) -> dict:
+    """
+    Set n_jobs/nthread on a fitted estimator (and on any sub-estimators)
+
+    Returns a mapping of estimator name -> thread count that was set.
+    """
+    applied = {}
+    name = type(model).__name__
+
+    if hasattr(model, 'get_params'):
+        params = model.get_params(deep=False)
+        for key in ('n_jobs', 'nthread'):
+            if key in params:
+                model.set_params(**{key: threads})
+                applied[name] = threads
+
+    # XGBoost keeps its own thread setting on the booster
+    if hasattr(model, 'get_booster'):
+        try:
+            model.get_booster().set_param({'nthread': threads})
+            applied[name] = threads
+        except Exception:
+            pass
+
+    # Ensembles (e.g. VotingClassifier/StackingClassifier) wrap other estimators
+    sub_models = getattr(model, 'estimators_', None)
+    if sub_models is None:
+        sub_models = []
+    for sub_model in sub_models:
+        if hasattr(sub_model, 'get_params') and not hasattr(sub_model, 'tree_'):
+            applied.update(set_model_threads(sub_model, threads))
+
+    return applied
@@ -0,0 +1,250 @@
+"""
+Startup warm-up and self-check for the ML service
+Runs synthetic and CSV-sampled batches through the full prediction pipeline so lazy
+initialization in NumPy/sklearn and cold caches are paid before real traffic arrives
+"""
+
+import os
+import time
+import random
+import threading
+from typing import List, Optional
+
+from app.utils.dataset import DEFAULT_CSV_PATH, INPUT_BOUNDS, INTEGER_FIELDS
+from app.utils.feature_store import load_patient_records
+from app.utils.scheduler import BULK, INTERACTIVE
+
+
+class WarmupConfig:
+    """
+    Warm-up settings, read from environment variables by from_env():
+        ML_WARMUP_ENABLED          - "0" to skip warm-up (default: "1")
+        ML_WARMUP_BATCH_SIZES      - batch sizes to warm up (default: "1,8,32", the max batch
+                                     size, the bulk lane chunk size and the job chunk size)
+        ML_WARMUP_ROUNDS           - passes per batch size and input source (default: 3)
+        ML_SELFCHECK_MIN_ACCURACY  - minimum agreement with medicalrisk.csv labels (default: 0.9)
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        batch_sizes: Optional[List[int]] = None,
+        rounds: int = 3,
+        min_accuracy: float = 0.9,
+        seed: int = 42
+    ):
+        self.enabled = enabled
+        self.batch_sizes = sorted(set(batch_sizes or [1, 8, 32]))
+        self.rounds = max(1, rounds)
+        self.min_accuracy = min_accuracy
+        self.seed = seed
+
+    @classmethod
+    def from_env(cls, max_batch_size: int, extra_sizes: Optional[List[int]] = None) -> "WarmupConfig":
+        """
+        extra_sizes: other batch sizes production traffic uses (bulk lane chunks,
+        job chunks); added to the default sizes
+        """
+        batch_sizes = os.getenv("ML_WARMUP_BATCH_SIZES")
+        if batch_sizes:
+            sizes = [int(v) for v in batch_sizes.split(',') if v.strip()]
+        else:
+            sizes = [1, 8, 32, max_batch_size] + list(extra_sizes or [])
+        return cls(
+            enabled=os.getenv("ML_WARMUP_ENABLED", "1") != "0",
+            batch_sizes=[size for size in sizes if size >= 1],
+            rounds=int(os.getenv("ML_WARMUP_ROUNDS", 3)),
+            min_accuracy=float(os.getenv("ML_SELFCHECK_MIN_ACCURACY", 0.9))
+        )
+
+
+def synthetic_records(n_rows: int, seed: int = 42) -> List[dict]:
+    """Random patient records inside the API input bounds"""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(n_rows):
+        record = {}
+        for name, (low, high) in INPUT_BOUNDS.items():
+            if name in INTEGER_FIELDS:
+                record[name] = rng.randint(low, high)
+            else:
+                record[name] = round(rng.uniform(low, high), 1)
+        records.append(record)
+    return records
+
+
+def _take(records: List[dict], start: int, size: int) -> List[dict]:
+    """size records starting at start, wrapping around"""
+    return [records[(start + i) % len(records)] for i in range(size)]
+
+
+def _predict(predictor, batch: List[dict]):
+    if len(batch) == 1:
+        return predictor.predict(**batch[0])
+    return predictor.predict_batch(batch)
+
+
+def run_lane_warmup(predictor, scheduler, records: List[dict]) -> dict:
+    """
+    One round on every lane's thread pool: single rows on the interactive lane and
+    bulk_chunk_size batches on the bulk lane, one call per pool thread at once so
+    every thread is started and has run the model
+    """
+    timings = {}
+    for lane_name, batch_size in ((INTERACTIVE, 1), (BULK, scheduler.bulk_chunk_size)):
+        lane = scheduler.lanes[lane_name]
+        start = time.perf_counter()
+        futures = [
+            lane.executor.submit(_predict, predictor, _take(records, i * batch_size, batch_size))
+            for i in range(lane.concurrency)
+        ]
+        for future in futures:
+            future.result()
+        timings[f"lane_{lane_name}_batch_{batch_size}_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return timings
+
+
+def run_warmup(predictor, config: WarmupConfig, scheduler=None) -> dict:
+    """
+    Run every configured batch size through predict() / predict_batch(), then
+    (with a scheduler) one round through the priority lanes' thread pools
+
+    Returns timing per batch size (last round, i.e. warm latency).
+    """
+    largest = max(config.batch_sizes)
+    sources = {'synthetic': synthetic_records(largest, seed=config.seed)}
+    if DEFAULT_CSV_PATH.exists():
+        csv_records, _ = load_patient_records(in_bounds_only=True)
+        if csv_records:
+            random.Random(config.seed).shuffle(csv_records)
+            sources['csv'] = csv_records
+
+    timings = {}
+    for batch_size in config.batch_sizes:
+        for source, records in sources.items():
+            for round_index in range(config.rounds):
+                batch = _take(records, round_index * batch_size, batch_size)
+                start = time.perf_counter()
+                _predict(predictor, batch)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+            timings[f"{source}_batch_{batch_size}_ms"] = round(elapsed_ms, 3)
+
+    if scheduler is not None:
+        timings.update(run_lane_warmup(predictor, scheduler, sources.get('csv', sources['synthetic'])))
+
+    return timings
+
+
+def run_self_check(predictor, config: WarmupConfig) -> dict:
+    """
+    Verify the loaded pipeline end to end:
+      - the label encoder maps High=0, Low=1
+      - batch and single predictions agree
+      - probabilities are valid and cover High/Low
+      - predictions agree with medicalrisk.csv labels (>= min_accuracy),
+        if the CSV is deployed alongside the model
+
+    Raises RuntimeError if any check fails.
+    """
+    classes = list(predictor.label_encoder.classes_)
+    if classes != ['High', 'Low']:
+        raise RuntimeError(f"Unexpected label encoder classes {classes} (expected ['High', 'Low'])")
+
+    if DEFAULT_CSV_PATH.exists():
+        records, labels = load_patient_records()
+        labelled = [(record, label) for record, label in zip(records, labels) if label]
+    else:
+        labelled = [(record, None) for record in synthetic_records(200, seed=config.seed)]
+    if not labelled:
+        raise RuntimeError("Self-check needs rows in medicalrisk.csv")
+
+    results = predictor.predict_batch([record for record, _ in labelled])
+    for result in results:
+        total = sum(result['probabilities'].values())
+        if set(result['probabilities']) != {'High', 'Low'} or abs(total - 1.0) > 1e-6:
+            raise RuntimeError(f"Invalid probabilities from model: {result['probabilities']}")
+
+    # Single-row path must match the batch path
+    sample = random.Random(config.seed).sample(range(len(labelled)), min(20, len(labelled)))
+    for i in sample:
+        single = predictor.predict(**labelled[i][0])
+        if single['risk_level'] != results[i]['risk_level']:
+            raise RuntimeError(
+                f"Single and batch predictions disagree on row {i}: "
+                f"{single['risk_level']} vs {results[i]['risk_level']}"
+            )
+
+    if labelled[0][1] is None:
+        return {'rows_checked': len(labelled), 'accuracy': None}
+
+    correct = sum(result['risk_level'] == label for result, (_, label) in zip(results, labelled))
+    accuracy = correct / len(labelled)
+    if accuracy < config.min_accuracy:
+        raise RuntimeError(
+            f"Self-check accuracy {accuracy:.2%} on medicalrisk.csv is below {config.min_accuracy:.0%}"
+        )
+
+    return {'rows_checked': len(labelled), 'accuracy': round(accuracy, 4)}
+
+
+class ReadinessState:
+    """Tracks warm-up progress for the /ready endpoint"""
+
+    def __init__(self):
+        self.status = "starting"
+        self.error = None
+        self.warmup = {}
+        self.self_check = {}
+        self.duration_seconds = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def run(self, predictor, config: WarmupConfig, scheduler=None):
+        """Warm up, self-check and mark ready (runs in a background thread)"""
+        start = time.perf_counter()
+        try:
+            if not predictor.is_loaded():
+                raise RuntimeError("Model or scaler not loaded")
+
+            if config.enabled:
+                with self._lock:
+                    self.status = "warming_up"
+                print(f"🔥 Warming up batch sizes {config.batch_sizes} ({config.rounds} rounds)...")
+                self.warmup = run_warmup(predictor, config, scheduler)
+
+            with self._lock:
+                self.status = "self_check"
+            self.self_check = run_self_check(predictor, config)
+
+            # Escalation stats should describe real requests, not warm-up/self-check rows
+            if getattr(predictor, 'cascade', None) is not None:
+                predictor.cascade.reset_stats()
+
+            with self._lock:
+                self.status = "ready"
+                self.duration_seconds = round(time.perf_counter() - start, 3)
+            print(f"✅ Service ready after {self.duration_seconds}s (self-check: {self.self_check})")
+        except Exception as e:
+            with self._lock:
+                self.status = "failed"
+                self.error = str(e)
+            print(f"❌ Warm-up/self-check failed: {e}")
+
+    def start(self, predictor, config: WarmupConfig, scheduler=None) -> threading.Thread:
+        thread = threading.Thread(target=self.run, args=(predictor, config, scheduler), daemon=True)
+        thread.start()
+        return thread
+
+    def describe(self) -> dict:
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'status': self.status,
+                'error': self.error,
+                'warmup': self.warmup,
+                'self_check': self.self_check,
+                'duration_seconds': self.duration_seconds,
+            }
@@ -0,0 +1,149 @@
+"""
+Throughput benchmark for different CPU thread budgets
+Run this from ml-service directory:
+    python benchmark.py --budgets 1,2,4 --batch-sizes 1,32,256 --concurrency 4
+
+Also compares bulk scoring of --bulk-rows rows on float features (scaler + sklearn
+predict_proba) against quantized bins (quantize_features + predict_proba_quantized).
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.models.predictor import PregnancyRiskPredictor
+from app.utils.dataset import is_in_bounds
+from app.utils.feature_store import load_features
+from app.utils.thread_budget import ThreadBudget, available_cpus
+
+
+def parse_int_list(value: str) -> list:
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def bench_batches(predictor, records, batch_size, min_seconds):
+    """Rows/second for predict_batch at one batch size"""
+    batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+    rows = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        for batch in batches:
+            predictor.predict_batch(batch)
+            rows += len(batch)
+    return rows / (time.perf_counter() - start)
+
+
+def bench_concurrent_singles(predictor, records, concurrency, min_seconds):
+    """Requests/second for single predictions issued from several threads"""
+    def run(chunk):
+        for record in chunk:
+            predictor.predict(**record)
+        return len(chunk)
+
+    chunks = [records[i::concurrency] for i in range(concurrency)]
+    rows = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while time.perf_counter() - start < min_seconds:
+            rows += sum(pool.map(run, chunks))
+    return rows / (time.perf_counter() - start)
+
+
+def bench_bulk(predictor, features, chunk_rows=65536):
+    """
+    Float vs quantized scoring of an engineered feature matrix
+
+    Returns {path: (rows/s, bytes held per row)}; the float path holds the float64
+    features plus their scaled copy, the quantized path only the bins.
+    """
+    n_rows = len(features)
+
+    start = time.perf_counter()
+    float_proba = np.empty((n_rows, 2))
+    for i in range(0, n_rows, chunk_rows):
+        chunk = features[i:i + chunk_rows]
+        float_proba[i:i + chunk_rows] = predictor.model.predict_proba(predictor.scaler.transform(chunk))
+    float_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bins = predictor.quantize_features(features, chunk_rows=chunk_rows)
+    quantized_proba = predictor.predict_proba_quantized(bins)
+    quantized_seconds = time.perf_counter() - start
+
+    if not np.array_equal(float_proba, quantized_proba):
+        raise AssertionError("Quantized probabilities differ from the float path")
+    return {
+        'float64 features': (n_rows / float_seconds, 2 * features.shape[1] * 8),
+        'quantized bins': (n_rows / quantized_seconds, bins.nbytes / n_rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark predictor throughput per thread budget")
+    parser.add_argument("--budgets", default=None,
+                        help="Comma-separated thread budgets (default: 1,2,4,... up to available CPUs)")
+    parser.add_argument("--batch-sizes", default="1,32,256", help="Comma-separated batch sizes")
+    parser.add_argument("--concurrency", type=int, default=4, help="Client threads for single predictions")
+    parser.add_argument("--singles", type=int, default=200, help="Rows used for the single-prediction test")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Minimum run time per measurement")
+    parser.add_argument("--bulk-rows", type=int, default=1_000_000,
+                        help="Rows for the float vs quantized bulk comparison (0 skips it)")
+    args = parser.parse_args()
+
+    if args.budgets:
+        budgets = parse_int_list(args.budgets)
+    else:
+        n_cpus = len(available_cpus())
+        budgets = sorted({min(2 ** i, n_cpus) for i in range(n_cpus.bit_length() + 1)})
+    batch_sizes = parse_int_list(args.batch_sizes)
+
+    print("=" * 70)
+    print("⏱️  THREAD BUDGET BENCHMARK")
+    print("=" * 70)
+
+    predictor = PregnancyRiskPredictor()
+    records = [record for record in load_features().to_records() if is_in_bounds(record)]
+    print(f"\nLoaded {len(records)} rows from medicalrisk.csv")
+    print(f"Available CPUs: {len(available_cpus())}")
+
+    header = f"{'budget':>7} | " + " | ".join(f"batch={b:>5} rows/s" for b in batch_sizes)
+    header += f" | singles x{args.concurrency} req/s"
+    print("\n" + header)
+    print("-" * len(header))
+
+    for budget in budgets:
+        predictor.apply_thread_budget(ThreadBudget(total_threads=budget))
+        batch_results = [
+            bench_batches(predictor, records, batch_size, args.seconds)
+            for batch_size in batch_sizes
+        ]
+        singles = bench_concurrent_singles(
+            predictor, records[:args.singles], args.concurrency, args.seconds
+        )
+        row = f"{budget:>7} | " + " | ".join(f"{r:>16,.0f}" for r in batch_results)
+        row += f" | {singles:>20,.0f}"
+        print(row)
+
+    if args.bulk_rows and predictor.quantized is not None:
+        # Tile the CSV rows up to --bulk-rows
+        features, _ = load_features().labelled()
+        features = np.resize(np.asarray(features), (args.bulk_rows, features.shape[1]))
+        print(f"\nBulk scoring, {args.bulk_rows:,} rows (budget {budgets[-1]}):")
+        for path, (rows_per_second, bytes_per_row) in bench_bulk(predictor, features).items():
+            print(f"   {path:<18} {rows_per_second:>12,.0f} rows/s  {bytes_per_row:>6.0f} bytes/row")
+
+    print("\n" + "=" * 70)
+    print("✅ Benchmark complete")
+    print("=" * 70)
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
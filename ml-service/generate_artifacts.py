@@ -8,13 +8,14 @@ Run this script to generate them from the training notebook logic.
 import sys
 from pathlib import Path
 import numpy as np
-import pandas as pd
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 import joblib
 
 # Add app to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from app.utils.feature_store import load_features, LABEL_CODES, MISSING_LABEL
+
 def generate_missing_artifacts():
     """
     Generate scaler and label encoder based on training logic
@@ -34,48 +35,14 @@ def generate_missing_artifacts():
         print("   Please ensure medicalrisk.csv exists in ml-service directory.")
         return False
     
-    print(f"\n1️⃣ Loading training data from {csv_path}...")
-    df = pd.read_csv(csv_path)
-    print(f"   Loaded {len(df)} records")
-    
-    # Feature engineering (match training notebook)
-    print("\n2️⃣ Engineering features...")
-    
-    # Calculate derived features
-    df['BP_diff'] = df['Systolic BP'] - df['Diastolic']
-    
-    # BMI category
-    df['BMI_cat'] = 0
-    df.loc[df['BMI'] >= 18.5, 'BMI_cat'] = 1
-    df.loc[df['BMI'] >= 24.9, 'BMI_cat'] = 2
-    df.loc[df['BMI'] >= 29.9, 'BMI_cat'] = 3
-    
-    # High BP
-    df['High_BP'] = ((df['Systolic BP'] >= 140) | (df['Diastolic'] >= 90)).astype(int)
-    
-    # High HR
-    df['High_HR'] = (df['Heart Rate'] >= 100).astype(int)
-    
-    # Risk factors
-    df['Risk_Factors'] = (
-        df['Previous Complications'] +
-        df['Preexisting Diabetes'] +
-        df['Gestational Diabetes'] +
-        df['Mental Health']
-    )
-    
-    print("   ✓ Derived features created")
-    
-    # Define feature columns (match training order)
-    feature_cols = [
-        'Age', 'Systolic BP', 'Diastolic', 'BS', 'Body Temp', 'BMI',
-        'Previous Complications', 'Preexisting Diabetes', 'Gestational Diabetes',
-        'Mental Health', 'Heart Rate',
-        'BP_diff', 'BMI_cat', 'High_BP', 'High_HR', 'Risk_Factors'
-    ]
+    print(f"\n1️⃣ Loading engineered features for {csv_path}...")
+    # Cached 16-column matrix (BP_diff, BMI_cat, High_BP, High_HR, Risk_Factors derived
+    # once and memory-mapped on later runs)
+    cached = load_features(csv_path)
+    print(f"   Loaded {len(cached)} records (cache: {cached.path.name})")
     
-    print(f"\n3️⃣ Creating StandardScaler...")
-    X = df[feature_cols].values
+    print(f"\n2️⃣ Creating StandardScaler...")
+    X = np.asarray(cached.features)
     
     scaler = StandardScaler()
     scaler.fit(X)
@@ -86,17 +53,18 @@ def generate_missing_artifacts():
     print(f"   Scaler mean shape: {scaler.mean_.shape}")
     print(f"   Scaler scale shape: {scaler.scale_.shape}")
     
-    print(f"\n4️⃣ Creating LabelEncoder...")
+    print(f"\n3️⃣ Creating LabelEncoder...")
     # Remove rows with missing Risk Level
-    df_clean = df.dropna(subset=['Risk Level']).copy()
-    print(f"   Removed {len(df) - len(df_clean)} rows with missing Risk Level")
+    has_label = cached.labels != MISSING_LABEL
+    risk_levels = np.array(list(LABEL_CODES))[cached.labels[has_label]]
+    print(f"   Removed {int((~has_label).sum())} rows with missing Risk Level")
     
     # Get unique risk levels (should be ['High', 'Low'])
-    unique_levels = df_clean['Risk Level'].unique()
+    unique_levels = np.unique(risk_levels)
     print(f"   Unique risk levels: {unique_levels}")
     
     label_encoder = LabelEncoder()
-    label_encoder.fit(df_clean['Risk Level'].values)
+    label_encoder.fit(risk_levels)
     
     encoder_path = base_dir / "label_encoder.pkl"
     joblib.dump(label_encoder, encoder_path)
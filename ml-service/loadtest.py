@@ -0,0 +1,512 @@
+"""
+End-to-end HTTP load test for the ML service
+
+Starts the FastAPI service locally (uvicorn subprocess), replays medicalrisk.csv rows
+with the same JSON payloads the backend MLClient sends, and sweeps concurrency levels
+and request mixes. Records throughput, latency percentiles, error rates and server RSS.
+
+Run this from ml-service directory:
+    python loadtest.py --concurrency 1,4,16 --duration 10 --output report.json
+    python loadtest.py --mix single=0.7,batch=0.2,cached=0.1 --batch-size 32
+    python loadtest.py --compare HEAD~1 HEAD          # compare two git revisions (same mix on both)
+    python loadtest.py --url http://localhost:8000    # use an already running service
+
+Request kinds:
+    single - POST /predict with a different CSV row each time
+    batch  - POST /predict/batch with --batch-size rows
+    cached - POST /predict repeating a small fixed set of payloads
+
+Kinds a service does not support (e.g. /predict/batch on older revisions) are dropped
+from the mix after a probe request; --compare runs only the kinds both revisions support.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from urllib.parse import urlparse
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.utils.feature_store import load_patient_records
+
+SERVICE_DIR = Path(__file__).parent
+REQUEST_TIMEOUT = 10  # seconds, same as MLClient
+CACHED_POOL_SIZE = 8
+
+
+# ---------------------------------------------------------------------------
+# Local service
+# ---------------------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def http_get(base_url: str, path: str, timeout: float = 5):
+    """GET and return (status, parsed JSON or None)"""
+    url = urlparse(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=timeout)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        body = response.read()
+        try:
+            return response.status, json.loads(body)
+        except ValueError:
+            return response.status, None
+    finally:
+        conn.close()
+
+
+def http_post(base_url: str, path: str, payload: dict, timeout: float = REQUEST_TIMEOUT) -> int:
+    """POST JSON and return the status code"""
+    url = urlparse(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=timeout)
+    try:
+        conn.request("POST", path, body=json.dumps(payload), headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def wait_until_ready(base_url: str, process=None, timeout: float = 120):
+    """Wait for /ready (or /health on revisions without /ready) to return 200"""
+    deadline = time.time() + timeout
+    path = "/ready"
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"ML service exited with code {process.returncode} during startup")
+        try:
+            status, _ = http_get(base_url, path)
+            if status == 200:
+                return
+            if status == 404 and path == "/ready":
+                path = "/health"
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise TimeoutError(f"ML service at {base_url} not ready after {timeout}s")
+
+
+class LocalService:
+    """uvicorn running app.main:app from a service directory on a free port"""
+
+    def __init__(self, service_dir: Path, log_path: Path):
+        self.service_dir = Path(service_dir)
+        self.log_path = Path(log_path)
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.process = None
+        self._log = None
+
+    def __enter__(self):
+        self._log = open(self.log_path, "w")
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app",
+             "--host", "127.0.0.1", "--port", str(self.port)],
+            cwd=self.service_dir, env=env,
+            stdout=self._log, stderr=subprocess.STDOUT
+        )
+        try:
+            wait_until_ready(self.base_url, self.process)
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self._log is not None:
+            self._log.close()
+
+
+def read_rss_mb(pid: int):
+    """Resident set size of a process in MB (Linux /proc; None elsewhere)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid: int, interval: float = 0.25):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss = read_rss_mb(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> dict:
+        self._stop_event.set()
+        self.join()
+        if not self.samples:
+            return {'rss_mean_mb': None, 'rss_peak_mb': None}
+        return {
+            'rss_mean_mb': round(sum(self.samples) / len(self.samples), 1),
+            'rss_peak_mb': round(max(self.samples), 1),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------------
+
+def parse_mix(value: str) -> dict:
+    """"single=0.8,batch=0.1,cached=0.1" -> {'single': 0.8, ...}"""
+    mix = {}
+    for part in value.split(','):
+        if not part.strip():
+            continue
+        kind, weight = part.split('=')
+        kind = kind.strip()
+        if kind not in ('single', 'batch', 'cached'):
+            raise ValueError(f"Unknown request kind in mix: {kind}")
+        mix[kind] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError(f"Invalid mix: {value}")
+    return mix
+
+
+def supported_kinds(base_url: str, records: list) -> set:
+    """Request kinds the service answers (one probe request per endpoint)"""
+    kinds = set()
+    if http_post(base_url, "/predict", records[0]) == 200:
+        kinds.update(('single', 'cached'))
+    if http_post(base_url, "/predict/batch", {'patients': records[:2]}) == 200:
+        kinds.add('batch')
+    return kinds
+
+
+def restrict_mix(mix: dict, kinds: set, label: str) -> dict:
+    """Drop request kinds that are not in kinds (with a warning)"""
+    dropped = sorted(set(mix) - kinds)
+    if dropped:
+        print(f"⚠️  {label}: dropping unsupported request kind(s) {', '.join(dropped)} from the mix")
+    restricted = {kind: weight for kind, weight in mix.items() if kind in kinds}
+    if not restricted:
+        raise RuntimeError(f"{label}: none of the request kinds in the mix are supported")
+    return restricted
+
+
+def load_records() -> list:
+    records, _ = load_patient_records(in_bounds_only=True)
+    random.Random(42).shuffle(records)
+    return records
+
+
+def percentile(sorted_values: list, pct: float):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize_latencies(latencies_ms: list) -> dict:
+    values = sorted(latencies_ms)
+    return {
+        'p50_ms': round(percentile(values, 50), 2) if values else None,
+        'p90_ms': round(percentile(values, 90), 2) if values else None,
+        'p99_ms': round(percentile(values, 99), 2) if values else None,
+        'max_ms': round(values[-1], 2) if values else None,
+    }
+
+
+class LoadWorker(threading.Thread):
+    """One client connection sending requests until the deadline"""
+
+    def __init__(self, base_url, records, mix, batch_size, deadline, seed):
+        super().__init__(daemon=True)
+        url = urlparse(base_url)
+        self.host, self.port = url.hostname, url.port
+        self.records = records
+        self.cached = records[:CACHED_POOL_SIZE]
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.batch_size = batch_size
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.results = []  # (kind, latency_ms, ok, rows)
+
+    def _payload(self, kind):
+        if kind == 'batch':
+            start = self.rng.randrange(len(self.records))
+            rows = [self.records[(start + i) % len(self.records)] for i in range(self.batch_size)]
+            return "/predict/batch", {'patients': rows}, len(rows)
+        if kind == 'cached':
+            return "/predict", self.rng.choice(self.cached), 1
+        return "/predict", self.rng.choice(self.records), 1
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=REQUEST_TIMEOUT)
+        headers = {'Content-Type': 'application/json'}
+        while time.perf_counter() < self.deadline:
+            kind = self.rng.choices(self.kinds, weights=self.weights)[0]
+            path, payload, rows = self._payload(kind)
+            body = json.dumps(payload)
+            start = time.perf_counter()
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=REQUEST_TIMEOUT)
+            self.results.append((kind, (time.perf_counter() - start) * 1000, ok, rows))
+        conn.close()
+
+
+def run_level(base_url, records, mix, batch_size, concurrency, duration, server_pid=None) -> dict:
+    """Run one concurrency level and summarize it"""
+    sampler = RssSampler(server_pid) if server_pid else None
+    if sampler:
+        sampler.start()
+
+    start = time.perf_counter()
+    deadline = start + duration
+    workers = [
+        LoadWorker(base_url, records, mix, batch_size, deadline, seed=i)
+        for i in range(concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    results = [result for worker in workers for result in worker.results]
+    ok_results = [r for r in results if r[2]]
+    level = {
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'requests': len(results),
+        'errors': len(results) - len(ok_results),
+        'error_rate': round((len(results) - len(ok_results)) / len(results), 4) if results else None,
+        'requests_per_s': round(len(ok_results) / elapsed, 1),
+        'rows_per_s': round(sum(r[3] for r in ok_results) / elapsed, 1),
+        **summarize_latencies([r[1] for r in ok_results]),
+        'by_kind': {},
+    }
+    for kind in mix:
+        kind_results = [r for r in results if r[0] == kind]
+        kind_ok = [r for r in kind_results if r[2]]
+        level['by_kind'][kind] = {
+            'requests': len(kind_results),
+            'errors': len(kind_results) - len(kind_ok),
+            'requests_per_s': round(len(kind_ok) / elapsed, 1),
+            **summarize_latencies([r[1] for r in kind_ok]),
+        }
+    if sampler:
+        level.update(sampler.stop())
+    return level
+
+
+def run_sweep(base_url, args, server_pid=None, label=None, mix=None) -> dict:
+    """Run every concurrency level; mix defaults to --mix restricted to supported kinds"""
+    records = load_records()
+    if mix is None:
+        mix = restrict_mix(parse_mix(args.mix), supported_kinds(base_url, records), label or base_url)
+
+    print(f"\n🚀 Load test {label or base_url}: mix={mix}, batch_size={args.batch_size}")
+    print(f"{'conc':>5} | {'req/s':>8} | {'rows/s':>9} | {'p50 ms':>8} | {'p99 ms':>8} | {'errors':>7} | {'RSS MB':>7}")
+    print("-" * 70)
+
+    levels = []
+    for concurrency in args.concurrency:
+        level = run_level(base_url, records, mix, args.batch_size, concurrency, args.duration, server_pid)
+        levels.append(level)
+        print(f"{concurrency:>5} | {level['requests_per_s']:>8} | {level['rows_per_s']:>9} | "
+              f"{level['p50_ms'] if level['p50_ms'] is not None else '-':>8} | "
+              f"{level['p99_ms'] if level['p99_ms'] is not None else '-':>8} | "
+              f"{level['error_rate'] if level['error_rate'] is not None else '-':>7} | "
+              f"{level.get('rss_peak_mb') or '-':>7}")
+
+    return {
+        'label': label,
+        'mix': mix,
+        'batch_size': args.batch_size,
+        'duration_s': args.duration,
+        'levels': levels,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Git revisions
+# ---------------------------------------------------------------------------
+
+def git(*args, cwd=SERVICE_DIR) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@contextmanager
+def revision_service(revision: str):
+    """Check out a revision into a temporary worktree and run its ML service"""
+    repo_root = Path(git("rev-parse", "--show-toplevel"))
+    service_subdir = SERVICE_DIR.resolve().relative_to(repo_root)
+    commit = git("rev-parse", "--short", revision)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f"loadtest-{commit}-"))
+    worktree = tmp_dir / "tree"
+
+    git("worktree", "add", "--detach", str(worktree), commit)
+    try:
+        log_path = tmp_dir / "service.log"
+        with LocalService(worktree / service_subdir, log_path) as service:
+            service.label = f"{revision} ({commit})"
+            service.commit = commit
+            yield service
+    finally:
+        git("worktree", "remove", "--force", str(worktree))
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def run_revision(revision: str, args) -> dict:
+    """Load test the ML service of one git revision"""
+    with revision_service(revision) as service:
+        report = run_sweep(service.base_url, args, service.process.pid, label=service.label)
+    report['revision'] = revision
+    report['commit'] = service.commit
+    return report
+
+
+def run_comparison(base_revision: str, head_revision: str, args) -> dict:
+    """
+    Load test two revisions with the same workload
+
+    Both services are started and probed first; only request kinds supported by
+    both are sent, so throughput and latency compare like for like. The sweeps run
+    one after the other (the other service is idle meanwhile).
+    """
+    records = load_records()
+    mix = parse_mix(args.mix)
+    with ExitStack() as stack:
+        services = [
+            stack.enter_context(revision_service(revision))
+            for revision in (base_revision, head_revision)
+        ]
+        for service in services:
+            mix = restrict_mix(mix, supported_kinds(service.base_url, records), service.label)
+
+        reports = []
+        for revision, service in zip((base_revision, head_revision), services):
+            report = run_sweep(service.base_url, args, service.process.pid, label=service.label, mix=mix)
+            report['revision'] = revision
+            report['commit'] = service.commit
+            reports.append(report)
+    return {'base': reports[0], 'head': reports[1]}
+
+
+def print_comparison(base: dict, head: dict):
+    """Per-level and per-kind throughput/latency deltas between two reports"""
+    def delta(old, new):
+        if old in (None, 0) or new is None:
+            return "    -"
+        return f"{(new - old) / old:+6.1%}"
+
+    print("\n" + "=" * 70)
+    print(f"📊 COMPARISON: {base['label']} -> {head['label']}")
+    print(f"   mix: {head['mix']}")
+    print("=" * 70)
+    print(f"{'conc':>5} {'kind':>7} | {'req/s':>19} | {'Δ':>7} | {'p99 ms':>17} | {'Δ':>7} | {'errors':>11}")
+    print("-" * 90)
+    for old, new in zip(base['levels'], head['levels']):
+        print(f"{old['concurrency']:>5} {'all':>7} | "
+              f"{old['requests_per_s']:>8} -> {new['requests_per_s']:>8} | "
+              f"{delta(old['requests_per_s'], new['requests_per_s']):>7} | "
+              f"{old['p99_ms'] or '-':>7} -> {new['p99_ms'] or '-':>7} | "
+              f"{delta(old['p99_ms'], new['p99_ms']):>7} | "
+              f"{old['error_rate']} -> {new['error_rate']}")
+        for kind, old_kind in old['by_kind'].items():
+            new_kind = new['by_kind'].get(kind)
+            if new_kind is None:
+                continue
+            print(f"{'':>5} {kind:>7} | "
+                  f"{old_kind['requests_per_s']:>8} -> {new_kind['requests_per_s']:>8} | "
+                  f"{delta(old_kind['requests_per_s'], new_kind['requests_per_s']):>7} | "
+                  f"{old_kind['p99_ms'] or '-':>7} -> {new_kind['p99_ms'] or '-':>7} | "
+                  f"{delta(old_kind['p99_ms'], new_kind['p99_ms']):>7} | "
+                  f"{old_kind['errors']} -> {new_kind['errors']}")
+
+
+def parse_int_list(value: str) -> list:
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test for the ML service")
+    parser.add_argument("--concurrency", type=parse_int_list, default=[1, 4, 16],
+                        help="Comma-separated concurrency levels (default: 1,4,16)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per concurrency level")
+    parser.add_argument("--mix", default="single=0.8,batch=0.1,cached=0.1",
+                        help="Request mix, e.g. single=0.8,batch=0.1,cached=0.1")
+    parser.add_argument("--batch-size", type=int, default=32, help="Rows per /predict/batch request")
+    parser.add_argument("--url", help="Test an already running service instead of starting one")
+    parser.add_argument("--revision", help="Start the service from this git revision")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"),
+                        help="Load test two git revisions and compare them")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🧪 ML SERVICE LOAD TEST")
+    print("=" * 70)
+
+    if args.compare:
+        report = run_comparison(args.compare[0], args.compare[1], args)
+        print_comparison(report['base'], report['head'])
+    elif args.revision:
+        report = run_revision(args.revision, args)
+    elif args.url:
+        wait_until_ready(args.url)
+        report = run_sweep(args.url, args, label=args.url)
+    else:
+        log_path = Path(tempfile.gettempdir()) / "ml-service-loadtest.log"
+        with LocalService(SERVICE_DIR, log_path) as service:
+            report = run_sweep(service.base_url, args, service.process.pid, label="working tree")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📁 Report written to {args.output}")
+
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
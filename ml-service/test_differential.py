@@ -0,0 +1,234 @@
+"""
+Differential correctness harness for the accelerated inference paths
+Every path is run against the reference pipeline:
+    engineer_features (row by row) -> scaler.transform -> model.predict_proba
+on all rows of medicalrisk.csv and on randomized in-bounds inputs, including the
+BMI/BP/HR threshold edges. Labels must be identical (High=0, Low=1) and
+probabilities must match within PROBABILITY_TOLERANCE.
+
+predict/predict_batch use quantized scoring (bin indices) by default; the float path
+(sklearn predict_proba on float features) is checked separately.
+
+The cascade (cascade_model.pkl) is approximate by design - its early answers use the
+first-stage probabilities - so it is checked for High-class safety instead: no row the
+reference calls High may come back Low.
+
+Run this from ml-service directory: python test_differential.py
+"""
+
+import sys
+from pathlib import Path
+import numpy as np
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.models.predictor import PregnancyRiskPredictor
+from app.utils.dataset import INPUT_BOUNDS, INTEGER_FIELDS
+from app.utils.feature_store import load_patient_records
+from app.utils.feature_engineering import (
+    engineer_features,
+    engineer_features_batch,
+    BASE_FEATURE_NAMES,
+)
+
+PROBABILITY_TOLERANCE = 1e-9
+N_RANDOM_ROWS = 1000
+
+# Clinical thresholds used by the derived features
+THRESHOLD_EDGES = {
+    'bmi': [18.5, 24.9, 29.9],
+    'systolic_bp': [140],
+    'diastolic_bp': [90],
+    'heart_rate': [100],
+}
+
+
+def random_records(n_rows: int, seed: int = 42) -> list:
+    """Uniform random records inside the API input bounds"""
+    rng = np.random.default_rng(seed)
+    records = []
+    for _ in range(n_rows):
+        record = {}
+        for name, (low, high) in INPUT_BOUNDS.items():
+            if name in INTEGER_FIELDS:
+                record[name] = int(rng.integers(low, high + 1))
+            else:
+                record[name] = float(rng.uniform(low, high))
+        records.append(record)
+    return records
+
+
+def edge_records(seed: int = 7) -> list:
+    """Random records with one field pinned at / around each clinical threshold"""
+    base_rows = random_records(20, seed=seed)
+    records = []
+    for name, thresholds in THRESHOLD_EDGES.items():
+        for threshold in thresholds:
+            values = [
+                threshold - 0.1,
+                np.nextafter(threshold, -np.inf),
+                threshold,
+                np.nextafter(threshold, np.inf),
+                threshold + 0.1,
+            ]
+            for row in base_rows:
+                for value in values:
+                    records.append(dict(row, **{name: float(value)}))
+    # Input bound corners
+    for name, (low, high) in INPUT_BOUNDS.items():
+        for row in base_rows[:5]:
+            records.append(dict(row, **{name: low}))
+            records.append(dict(row, **{name: high}))
+    return records
+
+
+# ---------------------------------------------------------------------------
+# Reference pipeline and inference paths
+# Each path takes (predictor, records) and returns (labels, probabilities) where
+# labels are 'High'/'Low' and probabilities is an (n_rows, 2) array of P(High), P(Low).
+# ---------------------------------------------------------------------------
+
+def reference_path(predictor, records):
+    features = np.array([engineer_features(**record) for record in records])
+    probabilities = predictor.model.predict_proba(predictor.scaler.transform(features))
+    encoded = predictor.model.classes_.take(np.argmax(probabilities, axis=1))
+    return list(predictor.label_encoder.inverse_transform(encoded)), probabilities
+
+
+def _from_results(results):
+    labels = [result['risk_level'] for result in results]
+    probabilities = np.array([
+        [result['probabilities']['High'], result['probabilities']['Low']] for result in results
+    ])
+    return labels, probabilities
+
+
+def single_predict_path(predictor, records):
+    return _from_results([predictor.predict(**record) for record in records])
+
+
+def batch_predict_path(predictor, records):
+    return _from_results(predictor.predict_batch(records))
+
+
+def vectorized_features_path(predictor, records):
+    base = np.array([[record[name] for name in BASE_FEATURE_NAMES] for record in records])
+    features = engineer_features_batch(base)
+    reference_features = np.array([engineer_features(**record) for record in records])
+    if not np.array_equal(features, reference_features):
+        mismatch = np.argwhere(features != reference_features)[0]
+        raise AssertionError(f"engineer_features_batch differs at row/feature {tuple(mismatch)}")
+    probabilities = predictor.model.predict_proba(predictor.scaler.transform(features))
+    encoded = predictor.model.classes_.take(np.argmax(probabilities, axis=1))
+    return list(predictor.label_encoder.inverse_transform(encoded)), probabilities
+
+
+def float_batch_path(predictor, records):
+    quantized, predictor.quantized = predictor.quantized, None
+    try:
+        return batch_predict_path(predictor, records)
+    finally:
+        predictor.quantized = quantized
+
+
+def quantized_bins_path(predictor, records):
+    base = np.array([[record[name] for name in BASE_FEATURE_NAMES] for record in records])
+    bins = predictor.quantize_features(engineer_features_batch(base), chunk_rows=512)
+    probabilities = predictor.predict_proba_quantized(bins)
+    encoded = predictor.model.classes_.take(np.argmax(probabilities, axis=1))
+    return list(predictor.label_encoder.inverse_transform(encoded)), probabilities
+
+
+INFERENCE_PATHS = {
+    'predict (single row)': single_predict_path,
+    'predict_batch': batch_predict_path,
+    'predict_batch (float path)': float_batch_path,
+    'engineer_features_batch': vectorized_features_path,
+    'quantize_features + predict_proba_quantized': quantized_bins_path,
+}
+
+
+def compare_path(name, path, predictor, records, reference_labels, reference_probabilities) -> bool:
+    labels, probabilities = path(predictor, records)
+    label_mismatches = [i for i, (a, b) in enumerate(zip(labels, reference_labels)) if a != b]
+    max_diff = float(np.abs(probabilities - reference_probabilities).max())
+
+    if label_mismatches:
+        i = label_mismatches[0]
+        print(f"   ❌ {name}: {len(label_mismatches)} label mismatch(es), "
+              f"first at row {i}: {labels[i]} vs reference {reference_labels[i]} ({records[i]})")
+        return False
+    if max_diff > PROBABILITY_TOLERANCE:
+        print(f"   ❌ {name}: probabilities differ by up to {max_diff:.3g} "
+              f"(tolerance {PROBABILITY_TOLERANCE:g})")
+        return False
+    print(f"   ✅ {name}: labels identical, max |Δp| = {max_diff:.3g}")
+    return True
+
+
+def check_cascade(cascade_predictor, records, reference_labels) -> bool:
+    labels, _ = batch_predict_path(cascade_predictor, records)
+    missed_high = [
+        i for i, (a, b) in enumerate(zip(labels, reference_labels)) if b == 'High' and a != 'High'
+    ]
+    agreement = np.mean([a == b for a, b in zip(labels, reference_labels)])
+
+    if missed_high:
+        i = missed_high[0]
+        print(f"   ❌ cascade: {len(missed_high)} reference-High row(s) answered Low, "
+              f"first at row {i} ({records[i]})")
+        return False
+    print(f"   ✅ cascade: no High rows lost, agreement {agreement:.2%}")
+    return True
+
+
+def run_differential() -> bool:
+    print("=" * 70)
+    print("🧪 TEST: Differential check of inference paths vs reference pipeline")
+    print("=" * 70)
+
+    try:
+        # The reference and every exact path use the full model only
+        predictor = PregnancyRiskPredictor(cascade=False)
+        cascade_predictor = PregnancyRiskPredictor(cascade=True)
+        if cascade_predictor.cascade is None:
+            cascade_predictor = None
+
+        csv_records, _ = load_patient_records()
+        datasets = {
+            'medicalrisk.csv': csv_records,
+            'random in-bounds': random_records(N_RANDOM_ROWS),
+            'threshold edges': edge_records(),
+        }
+
+        passed = True
+        for dataset_name, records in datasets.items():
+            print(f"\n📋 {dataset_name}: {len(records)} rows")
+            reference_labels, reference_probabilities = reference_path(predictor, records)
+            for name, path in INFERENCE_PATHS.items():
+                passed &= compare_path(
+                    name, path, predictor, records, reference_labels, reference_probabilities
+                )
+            if cascade_predictor is not None:
+                passed &= check_cascade(cascade_predictor, records, reference_labels)
+
+        print("\n" + "=" * 70)
+        print("✅ TEST PASSED!" if passed else "❌ TEST FAILED!")
+        print("=" * 70)
+        return passed
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_differential():
+    assert run_differential(), "An inference path disagrees with the reference pipeline"
+
+
+if __name__ == "__main__":
+    success = run_differential()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,278 @@
+"""
+Background scoring job tests (job store + workers) on a temporary job store
+Covers resuming a job whose worker stopped heartbeating, requeue on shutdown,
+cancelling queued and running jobs, per-row errors, results staying in input
+order across resumed chunks, streaming results from more than one thread, and a
+takeover race between two workers (heartbeats and ownership-checked progress).
+
+Run this from ml-service directory: python test_jobs.py
+"""
+
+import sys
+import json
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.models.predictor import PregnancyRiskPredictor
+from app.utils.feature_store import load_patient_records
+from app.utils.jobs import CANCELLED, COMPLETED, QUEUED, JobRunner, JobStore
+
+N_ROWS = 53
+CHUNK_SIZE = 10
+
+
+def make_runner(predictor, job_dir: Path, before_chunk=None) -> JobRunner:
+    # stale_seconds=0: any running job without a fresh heartbeat can be taken over
+    return JobRunner(
+        predictor, JobStore(job_dir), input_dir=job_dir,
+        chunk_size=CHUNK_SIZE, stale_seconds=0, before_chunk=before_chunk
+    )
+
+
+def report(condition: bool, message: str) -> bool:
+    print(f"   {'✅' if condition else '❌'} {message}")
+    return condition
+
+
+def check_results(store: JobStore, job_id: str, expected: list) -> bool:
+    """Results are complete, in input order and equal to predict_batch on all rows"""
+    results = list(store.iter_results(job_id))
+    in_order = [result['row'] for result in results] == list(range(len(expected)))
+    same = all(
+        {k: v for k, v in result.items() if k != 'row'} == prediction
+        for result, prediction in zip(results, expected)
+    )
+    return report(in_order and same, f"{len(results)} results in input order, identical to predict_batch")
+
+
+def check_stale_resume(predictor, records, expected, job_dir) -> bool:
+    print("\n1️⃣ Resume after a worker stops heartbeating")
+    crashed = make_runner(predictor, job_dir)
+    job_id = crashed.submit_rows(records)
+
+    # The first worker scores two chunks, then "crashes" (no finish, no requeue)
+    job = crashed.store.claim("crashed-worker", stale_seconds=60)
+    for chunk_index in range(2):
+        chunk = records[chunk_index * CHUNK_SIZE:(chunk_index + 1) * CHUNK_SIZE]
+        results, failed = crashed._score_chunk(chunk, first_row=chunk_index * CHUNK_SIZE)
+        crashed.store.save_chunk(job_id, "crashed-worker", chunk_index, results, failed, 0.0)
+
+    time.sleep(0.01)
+    resumed = make_runner(predictor, job_dir)
+    job = resumed.store.claim("second-worker", resumed.stale_seconds)
+    passed = report(job is not None and job['id'] == job_id, "stale running job is claimed again")
+    passed &= report(job['next_chunk'] == 2, f"resumes at chunk {job['next_chunk']} (expected 2)")
+    resumed.run_job(job)
+    passed &= report(resumed.store.get(job_id)['status'] == COMPLETED, "job completes")
+    passed &= check_results(resumed.store, job_id, expected)
+    return passed
+
+
+def check_requeue_on_shutdown(predictor, records, expected, job_dir) -> bool:
+    print("\n2️⃣ Requeue on shutdown, finish in another runner")
+    chunks_started = []
+
+    def stop_after_two_chunks():
+        chunks_started.append(1)
+        if len(chunks_started) == 2:
+            first._stop_event.set()
+
+    first = make_runner(predictor, job_dir, before_chunk=stop_after_two_chunks)
+    job_id = first.submit_rows(records)
+    first.run_job(first.store.claim("first-worker", first.stale_seconds))
+
+    job = first.store.get(job_id)
+    passed = report(job['status'] == QUEUED and job['worker'] is None, "job is back in the queue")
+    passed &= report(job['next_chunk'] == 2, f"progress kept ({job['next_chunk']} chunks done)")
+
+    second = make_runner(predictor, job_dir)
+    second.run_job(second.store.claim("second-worker", second.stale_seconds))
+    passed &= report(second.store.get(job_id)['status'] == COMPLETED, "job completes")
+    passed &= check_results(second.store, job_id, expected)
+    return passed
+
+
+def check_cancel(predictor, records, job_dir) -> bool:
+    print("\n3️⃣ Cancel queued and running jobs")
+    runner = make_runner(predictor, job_dir)
+
+    queued_id = runner.submit_rows(records)
+    runner.store.request_cancel(queued_id)
+    passed = report(runner.store.get(queued_id)['status'] == CANCELLED, "queued job is cancelled at once")
+    passed &= report(runner.store.claim("worker", runner.stale_seconds) is None, "cancelled job is not claimed")
+
+    chunks_started = []
+
+    def cancel_after_first_chunk():
+        chunks_started.append(1)
+        if len(chunks_started) == 2:
+            runner.store.request_cancel(running_id)
+
+    runner.before_chunk = cancel_after_first_chunk
+    running_id = runner.submit_rows(records)
+    runner.run_job(runner.store.claim("worker", runner.stale_seconds))
+    job = runner.store.get(running_id)
+    passed &= report(job['status'] == CANCELLED, "running job is cancelled")
+    # The chunk in progress when cancel was requested still finishes
+    passed &= report(
+        job['done_rows'] == 2 * CHUNK_SIZE,
+        f"stops after the current chunk ({job['done_rows']} rows scored)"
+    )
+    return passed
+
+
+def check_row_errors(predictor, records, job_dir) -> bool:
+    print("\n4️⃣ Invalid JSONL lines fail only their own row")
+    job_dir.mkdir(parents=True, exist_ok=True)
+    lines = [json.dumps(records[0]), "{not json", json.dumps([1, 2]), json.dumps(records[1])]
+    (job_dir / "input.jsonl").write_text("\n".join(lines) + "\n")
+
+    runner = make_runner(predictor, job_dir)
+    job_id = runner.submit_file("input.jsonl")
+    runner.run_job(runner.store.claim("worker", runner.stale_seconds))
+
+    job = runner.store.get(job_id)
+    results = list(runner.store.iter_results(job_id))
+    passed = report(job['status'] == COMPLETED, "job completes")
+    passed &= report(job['total_rows'] == 4, "rows counted by the worker")
+    passed &= report(
+        job['failed_rows'] == 2 and 'error' in results[1] and 'error' in results[2],
+        "malformed and non-object lines get per-row errors"
+    )
+    passed &= report('risk_level' in results[0] and 'risk_level' in results[3], "valid lines are scored")
+    return passed
+
+
+def check_results_across_threads(predictor, records, expected, job_dir) -> bool:
+    print("\n5️⃣ Results can be consumed from several threads")
+    runner = make_runner(predictor, job_dir)
+    job_id = runner.submit_rows(records)
+    runner.run_job(runner.store.claim("worker", runner.stale_seconds))
+
+    # Like StreamingResponse: every next() may run on a different thread pool thread
+    results = runner.store.iter_results(job_id)
+    consumed = []
+    errors = []
+
+    def next_row():
+        try:
+            consumed.append(next(results))
+        except StopIteration:
+            consumed.append(None)
+        except Exception as e:
+            errors.append(e)
+
+    while not errors and (not consumed or consumed[-1] is not None):
+        thread = threading.Thread(target=next_row)
+        thread.start()
+        thread.join()
+
+    rows = [row for row in consumed if row is not None]
+    passed = report(not errors, f"no errors switching threads ({errors[0] if errors else 'ok'})")
+    passed &= report(
+        [row['row'] for row in rows] == list(range(len(expected))),
+        f"{len(rows)} of {len(expected)} rows streamed, in input order"
+    )
+    return passed
+
+
+class SlowPredictor:
+    """predict_batch that takes longer than the runners' stale_seconds"""
+
+    def __init__(self, predictor, delay: float):
+        self.predictor = predictor
+        self.delay = delay
+
+    def predict_batch(self, records):
+        time.sleep(self.delay)
+        return self.predictor.predict_batch(records)
+
+
+def check_takeover_race(predictor, records, expected, job_dir) -> bool:
+    print("\n6️⃣ Two workers, chunks slower than stale_seconds")
+    slow = SlowPredictor(predictor, delay=0.5)
+    store = JobStore(job_dir)
+    runners = [
+        JobRunner(slow, store, input_dir=job_dir, chunk_size=CHUNK_SIZE, stale_seconds=0.3, poll_interval=0.05)
+        for _ in range(2)
+    ]
+    job_id = runners[0].submit_rows(records)
+    for runner in runners:
+        runner.start()
+    deadline = time.time() + 60
+    while store.get(job_id)['status'] != COMPLETED and time.time() < deadline:
+        time.sleep(0.05)
+    for runner in runners:
+        runner.stop()
+
+    job = store.get(job_id)
+    passed = report(job['status'] == COMPLETED, "job completes")
+    passed &= report(
+        job['done_rows'] == len(records) and job['failed_rows'] == 0,
+        f"done_rows {job['done_rows']} of {len(records)} (heartbeats keep the job from being reclaimed)"
+    )
+    passed &= check_results(store, job_id, expected)
+
+    # A worker that lost its job to a takeover cannot write progress any more
+    job_id = runners[0].submit_rows(records)
+    first = store.claim("first-worker", stale_seconds=60)
+    time.sleep(0.01)
+    second = store.claim("second-worker", stale_seconds=0)
+    results, failed = runners[0]._score_chunk(records[:CHUNK_SIZE], first_row=0)
+    saved_by_first = store.save_chunk(job_id, first['worker'], 0, results, failed, 0.0)
+    saved_by_second = store.save_chunk(job_id, second['worker'], 0, results, failed, 0.0)
+    passed &= report(
+        not saved_by_first and saved_by_second and store.get(job_id)['done_rows'] == CHUNK_SIZE,
+        "only the current owner's chunk is counted"
+    )
+    passed &= report(
+        not store.heartbeat(job_id, first['worker']) and store.heartbeat(job_id, second['worker']),
+        "the previous owner's heartbeat reports the job as lost"
+    )
+    return passed
+
+
+def run_jobs() -> bool:
+    print("=" * 70)
+    print("🧪 TEST: Background scoring jobs")
+    print("=" * 70)
+
+    try:
+        predictor = PregnancyRiskPredictor()
+        records, _ = load_patient_records(in_bounds_only=True, limit=N_ROWS)
+        expected = predictor.predict_batch(records)
+
+        passed = True
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            passed &= check_stale_resume(predictor, records, expected, tmp / "stale")
+            passed &= check_requeue_on_shutdown(predictor, records, expected, tmp / "requeue")
+            passed &= check_cancel(predictor, records, tmp / "cancel")
+            passed &= check_row_errors(predictor, records, tmp / "errors")
+            passed &= check_results_across_threads(predictor, records, expected, tmp / "threads")
+            passed &= check_takeover_race(predictor, records, expected, tmp / "race")
+
+        print("\n" + "=" * 70)
+        print("✅ TEST PASSED!" if passed else "❌ TEST FAILED!")
+        print("=" * 70)
+        return passed
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_jobs():
+    assert run_jobs(), "Background scoring job checks failed"
+
+
+if __name__ == "__main__":
+    success = run_jobs()
+    sys.exit(0 if success else 1)
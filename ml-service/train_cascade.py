@@ -0,0 +1,125 @@
+"""
+Train the first stage of the two-stage cascade (cascade_model.pkl)
+
+The first stage is a tiny model (logistic regression or depth-3 tree) fitted on the
+same scaled 16 features as the full model. It is fitted and calibrated on
+medicalrisk.csv plus random in-bounds rows labelled by the full model, so the
+thresholds also hold away from the training rows and the cascade never loses
+High-class recall.
+
+Run this from ml-service directory:
+    python train_cascade.py [--kind logistic|tree] [--min-confidence 0.9] [--synthetic-rows 20000]
+Then start the service with ML_CASCADE=1.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+import numpy as np
+import joblib
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.models.predictor import PregnancyRiskPredictor
+from app.models.cascade import fit_cascade, evaluate_cascade
+from app.utils.dataset import INPUT_BOUNDS, INTEGER_FIELDS
+from app.utils.feature_store import load_features
+from app.utils.feature_engineering import engineer_features_batch, BASE_FEATURE_NAMES
+
+
+def random_base_features(n_rows: int, seed: int = 123) -> np.ndarray:
+    """Uniform random base features inside the API input bounds"""
+    rng = np.random.default_rng(seed)
+    columns = []
+    for name in BASE_FEATURE_NAMES:
+        low, high = INPUT_BOUNDS[name]
+        if name in INTEGER_FIELDS:
+            columns.append(rng.integers(low, high + 1, size=n_rows).astype(np.float64))
+        else:
+            columns.append(rng.uniform(low, high, size=n_rows))
+    return np.column_stack(columns)
+
+
+def train_cascade(kind: str, min_confidence: float, synthetic_rows: int) -> bool:
+    print("=" * 70)
+    print("🪜 TRAINING CASCADE FIRST STAGE")
+    print("=" * 70)
+
+    base_dir = Path(__file__).parent
+    csv_path = base_dir / "medicalrisk.csv"
+    if not csv_path.exists():
+        print(f"❌ Error: {csv_path} not found!")
+        return False
+
+    print("\n1️⃣ Loading full model and preprocessing artifacts...")
+    predictor = PregnancyRiskPredictor(cascade=False)
+
+    print(f"\n2️⃣ Loading engineered features for {csv_path}...")
+    features, y_encoded = load_features(csv_path).labelled()
+    print(f"   Loaded {len(y_encoded)} labelled records")
+
+    features_scaled = predictor.scaler.transform(features)
+    # Encoded labels: High=0, Low=1 (same as the label encoder)
+
+    # Random in-bounds rows labelled by the full model cover the input space
+    # outside the CSV, so the thresholds hold for unseen patients too
+    fit_features, fit_labels = features_scaled, y_encoded
+    if synthetic_rows > 0:
+        synthetic_scaled = predictor.scaler.transform(
+            engineer_features_batch(random_base_features(synthetic_rows))
+        )
+        synthetic_labels = predictor.model.classes_.take(
+            np.argmax(predictor.model.predict_proba(synthetic_scaled), axis=1)
+        )
+        fit_features = np.vstack([features_scaled, synthetic_scaled])
+        fit_labels = np.concatenate([y_encoded, synthetic_labels])
+        print(f"   Added {synthetic_rows} random in-bounds rows labelled by the full model")
+
+    print(f"\n3️⃣ Fitting first stage ({kind}) and calibrating thresholds...")
+    cascade = fit_cascade(
+        predictor.model, fit_features, fit_labels,
+        kind=kind, min_confidence=min_confidence
+    )
+    # Report on the real patients only
+    report = evaluate_cascade(cascade, predictor.model, features_scaled, y_encoded)
+    cascade.report = report
+    print(f"   Low threshold:  {cascade.low_threshold:.4f}")
+    print(f"   High threshold: {cascade.high_threshold:.4f}")
+
+    print("\n4️⃣ Cascade vs full model on medicalrisk.csv:")
+    print(f"   Escalation rate:       {report['escalation_rate']:.2%}")
+    print(f"   Agreement with full:   {report['agreement_with_full']:.2%}")
+    print(f"   High recall (full):    {report['high_recall_full']:.2%}")
+    print(f"   High recall (cascade): {report['high_recall_cascade']:.2%}")
+
+    if report['high_recall_cascade'] < report['high_recall_full']:
+        print("❌ Cascade loses High-class recall - not saving")
+        return False
+
+    artifacts_dir = base_dir / "artifacts"
+    if (artifacts_dir / "pregnancy_risk_model.pkl").exists():
+        cascade_path = artifacts_dir / "cascade_model.pkl"
+    else:
+        cascade_path = base_dir / "cascade_model.pkl"
+    joblib.dump(cascade, cascade_path)
+
+    print("\n" + "=" * 70)
+    print(f"✅ Cascade saved to: {cascade_path}")
+    print("   Enable it with ML_CASCADE=1")
+    print("=" * 70)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the cascade first stage")
+    parser.add_argument("--kind", choices=["logistic", "tree"], default="logistic",
+                        help="First-stage model type")
+    parser.add_argument("--min-confidence", type=float, default=0.9,
+                        help="Lowest confidence at which the first stage may answer")
+    parser.add_argument("--synthetic-rows", type=int, default=20000,
+                        help="Random in-bounds rows added for fitting/calibration (0 to disable)")
+    args = parser.parse_args()
+
+    success = train_cascade(args.kind, args.min_confidence, args.synthetic_rows)
+    sys.exit(0 if success else 1)